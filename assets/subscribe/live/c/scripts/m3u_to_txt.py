@@ -1,14 +1,17 @@
 import urllib.request
-import opencc #简繁转换
+import sys
+from pathlib import Path
+
+# 简繁转换使用scripts/livesource中共享的转换服务（每个进程只加载一次词典）
+sys.path.insert(0, str(Path(__file__).resolve().parents[5] / "scripts" / "livesource"))
+from t2s_converter import get_converter
 
 all_lines = []
 
 #简繁转换
 def traditional_to_simplified(text: str) -> str:
-    # 初始化转换器，"t2s" 表示从繁体转为简体
-    converter = opencc.OpenCC('t2s')
-    simplified_text = converter.convert(text)
-    return simplified_text
+    # "t2s" 表示从繁体转为简体
+    return get_converter('t2s').convert(text)
 
 def convert_m3u_to_txt(m3u_content):
     # 分行处理
@@ -2,11 +2,17 @@
 """
 FreeTV 主程序 - 基于成功代码重构
 """
-import urllib.request
 import os
+import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+# 使用livesource目录下的共享下载引擎（连接复用）
+sys.path.insert(0, str(Path(__file__).parent.parent / "livesource"))
+from fetcher import fetch_url
+from http_cache import HttpCache
+from text_decoder import decode_bytes
+
 class FreeTVProcessor:
     def __init__(self):
         # 设置路径
@@ -21,6 +27,9 @@ class FreeTVProcessor:
         self.freetv_dictionary_cctv = self.read_txt_to_array('cctv_list.txt')
         self.freetv_dictionary_ws = self.read_txt_to_array('ws_list.txt')
         
+        # 订阅源HTTP缓存（ETag/Last-Modified条件请求）
+        self.http_cache = HttpCache(str(self.script_dir / "cache" / "http"))
+        
         # 存储数据
         self.freetv_lines = []
         self.freetv_cctv_lines = []
@@ -83,20 +92,24 @@ class FreeTVProcessor:
     def process_url(self, url):
         """处理URL"""
         try:
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            with urllib.request.urlopen(req) as response:
-                data = response.read()
-                text = data.decode('utf-8')
+            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+            headers.update(self.http_cache.conditional_headers(url))
+            response = fetch_url(url, headers=headers)
+            lines = self.http_cache.get_lines(url) if response.status == 304 else None
+            if lines is None:
+                response.raise_for_status()
+                text, encoding = decode_bytes(response.body, self.http_cache.get_encoding(url))
                 lines = text.split('\n')
-                print(f"处理URL: {url}, 行数: {len(lines)}")
-                
-                for line in lines:
-                    if "#genre#" not in line and "," in line and "://" in line:
-                        channel_name, channel_address = line.split(',', 1)
-                        if channel_name in self.freetv_dictionary:
-                            self.process_channel_line(line)
+                self.http_cache.store(url, response, lines, encoding)
+            else:
+                print(f"源未修改(304)，使用缓存: {url}")
+            print(f"处理URL: {url}, 行数: {len(lines)}")
+            
+            for line in lines:
+                if "#genre#" not in line and "," in line and "://" in line:
+                    channel_name, channel_address = line.split(',', 1)
+                    if channel_name in self.freetv_dictionary:
+                        self.process_channel_line(line)
         except Exception as e:
             print(f"处理URL时发生错误：{e}")
 
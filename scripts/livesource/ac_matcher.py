@@ -0,0 +1,107 @@
+"""
+Aho-Corasick 多模式串匹配
+功能：把一组关键字（如 CCTV.txt、体育赛事.txt、咪咕赛事.txt 中的名称）构建成自动机，
+      对文本只扫描一遍即可找出所有出现的关键字及其附带的值（如所属分类），
+      代替 any(keyword in text for keyword in keywords) 的逐个关键字查找。
+"""
+
+class AhoCorasick:
+    """多模式串匹配自动机：add() 添加关键字后调用 build()，之后可反复匹配"""
+
+    def __init__(self, patterns=None):
+        self.goto = [{}]      # 状态 -> {字符: 下一状态}
+        self.fail = [0]       # 状态 -> 失配后跳转的状态
+        self.own_output = [()]  # 状态 -> 恰好在此结束的 ((关键字, 值), ...)
+        self.output = [()]    # 状态 -> 在此结束的 ((关键字, 值), ...)（含失配链上的，build时计算）
+        self.always = ()      # 空关键字：任何文本都匹配
+        self.built = False
+        if patterns is not None:
+            for pattern in patterns:
+                self.add(pattern, pattern)
+            self.build()
+
+    def add(self, pattern, value=None):
+        """添加关键字，value为匹配时一并返回的值"""
+        if not pattern:
+            self.always += ((pattern, value),)
+            return
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.own_output.append(())
+            state = next_state
+        self.own_output[state] += ((pattern, value),)
+        self.built = False
+
+    def build(self):
+        """按广度优先计算失配跳转，并把失配链上的输出合并到每个状态"""
+        self.output = list(self.own_output)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        for state in queue:  # queue在遍历中追加，即广度优先
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+        self.built = True
+
+    def iter_matches(self, text):
+        """按出现位置依次返回 (结束位置, 关键字, 值)"""
+        if not self.built:
+            self.build()
+        for pattern, value in self.always:
+            yield 0, pattern, value
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, value in output[state]:
+                yield index + 1, pattern, value
+
+    def search(self, text):
+        """返回第一个匹配的 (关键字, 值)，无匹配返回None"""
+        for _, pattern, value in self.iter_matches(text):
+            return pattern, value
+        return None
+
+    def contains_any(self, text):
+        """文本中是否出现任一关键字（找到即停止）"""
+        if not self.built:
+            self.build()
+        if self.always:
+            return True
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+    def values(self, text):
+        """文本中出现的所有关键字对应的值（去重）"""
+        if not self.built:
+            self.build()
+        found = {value for _, value in self.always}
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for _, value in output[state]:
+                found.add(value)
+        return found
@@ -0,0 +1,241 @@
+"""
+直播源聚合流水线基准测试
+功能：用 主频道/ 地方台/ 字典中的频道名生成大规模合成订阅源（TXT与M3U各半），
+      通过本地HTTP服务器提供给 livesource.py 完整运行一遍，
+      汇总各阶段耗时（下载、解析、名称清理、分类、合并、校正排序、TXT/M3U生成）写入JSON，
+      便于不同提交之间对比性能变化。
+
+用法（在仓库根目录运行）：
+    python scripts/livesource/benchmark.py --sizes 10000,100000,1000000 --output bench.json
+    python scripts/livesource/benchmark.py --sizes 10000 --compare bench.json
+"""
+
+import argparse
+import functools
+import glob
+import http.server
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+
+# 频道名附加的噪声（覆盖名称清理规则）
+NAME_NOISE = ["高清", "HD", "「IPV6」", "-HD", "[超清]", "频道", "_电信", "台"]
+GENRES = ["央视频道", "卫视频道", "地方频道", "其他"]
+
+# ======= 合成数据生成 =======
+
+def load_channel_names():
+    """读取所有分类字典中的频道名"""
+    names = []
+    for path in sorted(glob.glob(os.path.join(SCRIPT_DIR, '主频道', '*.txt')) +
+                       glob.glob(os.path.join(SCRIPT_DIR, '地方台', '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            names.extend(line.strip() for line in f if line.strip())
+    return names
+
+def get_traditional_names(names):
+    """批量把频道名转为繁体（用于生成繁体频道名），未安装opencc时返回None"""
+    try:
+        from t2s_converter import get_converter
+    except ImportError:
+        return None
+    return dict(zip(names, get_converter('s2t').convert_many(names)))
+
+def generate_lines(count, names, args, rng):
+    """生成count行 (频道名, URL) 数据"""
+    traditional_names = get_traditional_names(names) if args.trad_ratio > 0 else None
+    urls = []
+    lines = []
+    for i in range(count):
+        if rng.random() < args.unknown_ratio:
+            name = f"测试频道{rng.randrange(count)}"  # 不在任何字典中，进入其他频道
+        else:
+            name = rng.choice(names)
+        if traditional_names and rng.random() < args.trad_ratio:
+            name = traditional_names.get(name, name)
+        if rng.random() < args.noise_ratio:
+            name += rng.choice(NAME_NOISE)
+
+        if urls and rng.random() < args.dup_ratio:
+            url = rng.choice(urls)  # 重复URL，覆盖去重逻辑
+        else:
+            url = f"http://bench{i % 97}.example.com/live/{i}.m3u8"
+            urls.append(url)
+        if rng.random() < args.multi_ratio:
+            extra = [f"http://mirror{j}.example.com/live/{i}.m3u8" for j in range(rng.randint(1, 2))]
+            url = "#".join([url] + extra)  # #分隔的加速源
+        lines.append((name, url))
+    return lines
+
+def write_source(path, lines, is_m3u):
+    """把 (频道名, URL) 写成TXT或M3U订阅源"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if is_m3u:
+            f.write("#EXTM3U\n")
+            for i, (name, url) in enumerate(lines):
+                group = GENRES[i % len(GENRES)]
+                f.write(f'#EXTINF:-1 tvg-name="{name}" group-title="{group}",{name}\n{url}\n')
+        else:
+            for i, (name, url) in enumerate(lines):
+                if i % 500 == 0:
+                    f.write(f"{GENRES[(i // 500) % len(GENRES)]},#genre#\n")
+                f.write(f"{name},{url}\n")
+
+def generate_sources(data_dir, count, names, args):
+    """生成args.sources个订阅源（TXT/M3U交替），返回文件名列表和总字节数"""
+    rng = random.Random(args.seed)
+    lines = generate_lines(count, names, args, rng)
+    file_names = []
+    per_source = (count + args.sources - 1) // args.sources
+    for index in range(args.sources):
+        is_m3u = index % 2 == 1
+        file_name = f"source{index}.{'m3u' if is_m3u else 'txt'}"
+        write_source(os.path.join(data_dir, file_name), lines[index * per_source:(index + 1) * per_source], is_m3u)
+        file_names.append(file_name)
+    total_bytes = sum(os.path.getsize(os.path.join(data_dir, name)) for name in file_names)
+    return file_names, total_bytes
+
+# ======= 本地服务器与运行 =======
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def start_server(data_dir):
+    """在后台线程启动本地HTTP服务器，返回 (服务器, 端口)"""
+    handler = functools.partial(QuietHandler, directory=data_dir)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+def prepare_work_dir(work_dir, source_urls):
+    """复制livesource脚本目录（不含缓存和快照），订阅源改为本地服务器上的合成源"""
+    target = os.path.join(work_dir, 'scripts', 'livesource')
+    shutil.copytree(SCRIPT_DIR, target, ignore=shutil.ignore_patterns('cache', 'snapshot', '__pycache__'))
+    os.makedirs(os.path.join(work_dir, 'output'), exist_ok=True)
+    with open(os.path.join(target, 'urls-daily.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(source_urls) + '\n')
+    with open(os.path.join(target, 'source_budget.txt'), 'a', encoding='utf-8') as f:
+        f.write('\naktv.space,0\n')  # 时间预算为0：不请求AKTV，直接使用本地备份
+
+def run_pipeline(work_dir):
+    """运行一次livesource.py，返回 (总耗时, 各阶段耗时)"""
+    stages_path = os.path.join(work_dir, 'stages.json')
+    env = dict(os.environ,
+               BENCH_STAGES=stages_path,
+               STREAM_PARSE='0',       # 下载与解析分开计时
+               CLASSIFY_CACHE='0',     # 每次都完整分类
+               SNAPSHOT_MODE='',
+               RUN_DEADLINE='86400',
+               REQUEST_TIMEOUT='3600',
+               PYTHONHASHSEED='0')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, 'scripts/livesource/livesource.py'], cwd=work_dir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    wall_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stdout[-4000:])
+        raise RuntimeError(f"livesource.py 运行失败（退出码 {result.returncode}）")
+    with open(stages_path, 'r', encoding='utf-8') as f:
+        return wall_seconds, json.load(f)
+
+def benchmark_size(count, names, args):
+    """对一个规模运行基准测试（重复args.repeat次取总耗时最短的一次）"""
+    with tempfile.TemporaryDirectory(prefix='livesource-bench-') as temp_dir:
+        data_dir = os.path.join(temp_dir, 'data')
+        os.makedirs(data_dir)
+        file_names, total_bytes = generate_sources(data_dir, count, names, args)
+        server, port = start_server(data_dir)
+        try:
+            best = None
+            for _ in range(args.repeat):
+                work_dir = tempfile.mkdtemp(dir=temp_dir)
+                prepare_work_dir(work_dir, [f"http://127.0.0.1:{port}/{name}" for name in file_names])
+                wall_seconds, stages = run_pipeline(work_dir)
+                if best is None or wall_seconds < best[0]:
+                    best = (wall_seconds, stages)
+        finally:
+            server.shutdown()
+            server.server_close()
+    wall_seconds, stages = best
+    return {'lines': count, 'bytes': total_bytes, 'wall_seconds': round(wall_seconds, 3), 'stages': stages}
+
+# ======= 结果输出与对比 =======
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+def print_run(run):
+    print(f"\n=== {run['lines']} 行 ({run['bytes']} 字节), 总耗时 {run['wall_seconds']:.2f} 秒 ===")
+    for stage, item in run['stages'].items():
+        print(f"{stage:<14} {item['seconds']:>10.3f} 秒  ({item['calls']} 次)")
+
+def print_compare(results, baseline_path):
+    """与之前的结果文件逐阶段对比（>1表示变慢）"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    baseline_runs = {run['lines']: run for run in baseline['runs']}
+    print(f"\n=== 对比 {baseline_path} (提交 {baseline.get('commit', '')}) ===")
+    for run in results['runs']:
+        old = baseline_runs.get(run['lines'])
+        if old is None:
+            continue
+        print(f"{run['lines']} 行: 总耗时 {old['wall_seconds']:.2f} -> {run['wall_seconds']:.2f} 秒")
+        for stage, item in run['stages'].items():
+            old_item = old['stages'].get(stage)
+            if old_item and old_item['seconds']:
+                ratio = item['seconds'] / old_item['seconds']
+                print(f"  {stage:<14} {old_item['seconds']:>10.3f} -> {item['seconds']:>10.3f} 秒  ({ratio:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="livesource流水线基准测试")
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="合成源总行数，逗号分隔")
+    parser.add_argument('--sources', type=int, default=4, help="订阅源个数（TXT/M3U交替）")
+    parser.add_argument('--dup-ratio', type=float, default=0.2, help="重复URL比例")
+    parser.add_argument('--trad-ratio', type=float, default=0.1, help="繁体频道名比例")
+    parser.add_argument('--multi-ratio', type=float, default=0.05, help="#分隔多URL行比例")
+    parser.add_argument('--noise-ratio', type=float, default=0.3, help="频道名带清理噪声的比例")
+    parser.add_argument('--unknown-ratio', type=float, default=0.1, help="不在字典中的频道名比例")
+    parser.add_argument('--repeat', type=int, default=1, help="每个规模重复次数（取最快一次）")
+    parser.add_argument('--seed', type=int, default=20250101, help="随机种子")
+    parser.add_argument('--output', default='bench_livesource.json', help="结果JSON文件")
+    parser.add_argument('--compare', help="与之前的结果JSON对比")
+    args = parser.parse_args()
+
+    names = load_channel_names()
+    results = {
+        'commit': get_commit(),
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'runs': [],
+    }
+    for count in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        print(f"运行 {count} 行...")
+        run = benchmark_size(count, names, args)
+        print_run(run)
+        results['runs'].append(run)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到: {args.output}")
+    if args.compare:
+        print_compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,12 @@ from urllib.parse import urlparse
 import socket
 import subprocess
 import traceback
+import sys
+
+# 订阅源下载使用上级目录的共享下载引擎
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher import fetch_url
+from text_decoder import decode_bytes
 
 timestart = datetime.now()
 BlackHost = ["127.0.0.1:8080", "live3.lalifeier.eu.org", "newcntv.qcloudcdn.com"]
@@ -166,22 +172,22 @@ def convert_m3u_to_txt(m3u_content):
 
 def process_url(url):
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read()
-            text = data.decode('utf-8')
-            if get_url_file_extension(url) in [".m3u", ".m3u8"]:
-                m3u_lines = convert_m3u_to_txt(text)
-                stats = f"{len(m3u_lines)},{url.strip()}"
-                url_statistics.append(stats)
-                runtime_stats.append(f"远程订阅统计: {stats}")  # 收集统计
-                urls_all_lines.extend(m3u_lines)
-            elif get_url_file_extension(url) == ".txt":
-                lines = text.split('\n')
-                valid_lines = [line.strip() for line in lines if "#genre#" not in line and "," in line and "://" in line]
-                stats = f"{len(valid_lines)},{url.strip()}"
-                url_statistics.append(stats)
-                runtime_stats.append(f"远程订阅统计: {stats}")  # 收集统计
-                urls_all_lines.extend(valid_lines)
+        response = fetch_url(url)
+        response.raise_for_status()
+        text = decode_bytes(response.body)[0]
+        if get_url_file_extension(url) in [".m3u", ".m3u8"]:
+            m3u_lines = convert_m3u_to_txt(text)
+            stats = f"{len(m3u_lines)},{url.strip()}"
+            url_statistics.append(stats)
+            runtime_stats.append(f"远程订阅统计: {stats}")  # 收集统计
+            urls_all_lines.extend(m3u_lines)
+        elif get_url_file_extension(url) == ".txt":
+            lines = text.split('\n')
+            valid_lines = [line.strip() for line in lines if "#genre#" not in line and "," in line and "://" in line]
+            stats = f"{len(valid_lines)},{url.strip()}"
+            url_statistics.append(stats)
+            runtime_stats.append(f"远程订阅统计: {stats}")  # 收集统计
+            urls_all_lines.extend(valid_lines)
     except Exception as e:
         err_msg = f"处理URL[{url}]失败: {e}"
         print(err_msg)
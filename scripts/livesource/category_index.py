@@ -0,0 +1,46 @@
+"""
+频道分类索引
+功能：启动时把所有精确匹配分类的字典合并成一个 频道名 -> 候选分类 的哈希索引，
+      分类时一次字典查找代替逐个字典的线性扫描；子串匹配分类（央视、体育赛事、咪咕赛事）的所有关键字
+      合并成一个Aho-Corasick自动机，扫描一遍频道名即可得到全部命中的分类，
+      结果按分类规则的原始顺序合并，与逐条规则判断的结果完全一致。
+"""
+
+from ac_matcher import AhoCorasick
+
+class CategoryIndex:
+    """
+    分类规则索引
+    :param rules: [(分类名, 字典列表, 是否子串匹配)]，顺序即分类优先级
+    """
+
+    def __init__(self, rules):
+        self.exact_index = {}       # 频道名 -> ((规则序号, 分类名), ...)
+        self.substring_matcher = AhoCorasick()  # 子串匹配关键字 -> (规则序号, 分类名)
+        for order, (category, dictionary, substring) in enumerate(rules):
+            if substring:
+                for item in dictionary:
+                    self.substring_matcher.add(item, (order, category))
+                continue
+            for name in dictionary:
+                matches = self.exact_index.get(name, ())
+                if not matches or matches[-1][1] != category:  # 同一字典内重复的名称只记一次
+                    self.exact_index[name] = matches + ((order, category),)
+        self.substring_matcher.build()
+
+    def match(self, channel_name):
+        """返回频道名匹配的所有分类（按规则顺序）"""
+        matches = self.substring_matcher.values(channel_name)
+        exact = self.exact_index.get(channel_name, ())
+        if matches:
+            matches = sorted(matches.union(exact))
+        else:
+            matches = exact
+        return tuple(category for _, category in matches)
+
+    def explain(self, channel_name):
+        """调试用：返回命中的 [(分类名, 命中的关键字)]，精确匹配的关键字即频道名本身"""
+        details = [(order, category, pattern)
+                   for _, pattern, (order, category) in self.substring_matcher.iter_matches(channel_name)]
+        details.extend((order, category, channel_name) for order, category in self.exact_index.get(channel_name, ()))
+        return [(category, pattern) for _, category, pattern in sorted(details)]
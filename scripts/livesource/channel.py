@@ -0,0 +1,72 @@
+"""
+频道记录
+功能：用__slots__紧凑保存一个频道条目（原始名、规范化名称、URL、所属分类、来源序号、响应时间），
+      从解析分类、合并去重、名称校正一直传到排序输出，只在写文件时才拼成 "名称,URL" 文本，
+      各阶段不再对同一行反复 split(',')。
+"""
+
+class Channel:
+    """频道条目：按输出内容（名称和URL）判断相等，set()去重的口径与原先的 "名称,URL" 文本一致"""
+
+    __slots__ = ('raw_name', 'name', 'url', 'category', 'source', 'latency')
+
+    def __init__(self, raw_name, name, url, category=None, source=None, latency=None):
+        self.raw_name = raw_name    # 订阅源中的原始频道名
+        self.name = name            # 规范化后的频道名（输出用）
+        self.url = url
+        self.category = category    # 所属分类（如 yangshi、other）
+        self.source = source        # 来源订阅源序号（白名单、手工区为None）
+        self.latency = latency      # 响应时间（毫秒，白名单提供），未知为None
+
+    def replace(self, **changes):
+        """返回修改了部分字段的新记录"""
+        channel = Channel(self.raw_name, self.name, self.url, self.category, self.source, self.latency)
+        for field, value in changes.items():
+            setattr(channel, field, value)
+        return channel
+
+    def __str__(self):
+        return f"{self.name},{self.url}"
+
+    def __repr__(self):
+        return f"Channel({self.name!r}, {self.url!r}, category={self.category!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Channel):
+            return NotImplemented
+        return self.name == other.name and self.url == other.url
+
+    def __hash__(self):
+        return hash((self.name, self.url))
+
+def read_channels(file_name, category=None):
+    """读取 "名称,URL" 格式的文本文件为频道记录列表（跳过空行和不含逗号的行）"""
+    channels = []
+    try:
+        with open(file_name, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if ',' in line:
+                    name, url = line.split(',', 1)
+                    channels.append(Channel(name, name, url, category))
+    except FileNotFoundError:
+        print(f"File '{file_name}' not found.")
+    return channels
+
+def playlist_entries(lines):
+    """
+    按输出文件的格式逐行取出频道：lines为输出内容（频道记录、"分组名,#genre#"标记和文本行，文本行中可能含换行），
+    返回 [(分组名, 名称, URL)]；不是恰好一个逗号的行跳过（与生成M3U的取法相同）
+    """
+    entries = []
+    group_name = ""
+    for item in lines:
+        for line in str(item).split("\n"):
+            parts = line.split(",")
+            if len(parts) != 2:
+                continue
+            if "#genre#" in line:
+                group_name = parts[0]  # 更新分组名称
+                continue
+            entries.append((group_name, parts[0], parts[1]))
+    return entries
@@ -0,0 +1,79 @@
+"""
+订阅源分类结果缓存
+功能：按URL保存上次的响应体哈希和分类结果，响应体逐字节相同且分类规则版本
+      （字典文件、名称校正文件、主脚本和分类依赖的模块）未变时，直接复用分类结果，跳过名称清理、繁转简和分类匹配。
+      按URL而不是按分类保存：一行的分类结果是它命中的全部候选分类，任一字典变化都可能改变任意源中任意行的结果，
+      所以规则版本只有一个，字典修改后所有源重新分类一次（字典很少修改，早晚两次运行之间通常不变）。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from channel import Channel
+
+def files_version(paths):
+    """计算一组文件的版本哈希（文件名+内容），任一文件变化时版本改变"""
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ClassifyCache:
+    """分类结果缓存（每个URL一个json文件：规则版本、响应体哈希、分类结果）"""
+
+    def __init__(self, cache_dir, version):
+        self.cache_dir = cache_dir
+        self.version = version
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0      # 复用分类结果的源数
+        self.misses = 0    # 重新分类的源数
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, url):
+        """读取URL的缓存，返回 (响应体哈希, 分类结果列表)；不存在或规则版本不同时返回None"""
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != self.version:
+            return None
+        entries = [(tuple(candidates), Channel(*channel), tuple(display) if display else None)
+                   for candidates, channel, display in data['entries']]
+        return data['body_hash'], entries
+
+    def hit(self, url):
+        """记录一次复用"""
+        self.hits += 1
+        os.utime(self._path(url))  # 记录最近使用时间
+
+    def store(self, url, body_hash, entries):
+        """保存响应体哈希和分类结果（频道记录只保存原始名、名称和URL）"""
+        self.misses += 1
+        rows = [(candidates, (channel.raw_name, channel.name, channel.url), display)
+                for candidates, channel, display in entries]
+        data = {'version': self.version, 'body_hash': body_hash, 'entries': rows}
+        path = self._path(url)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def prune(self, max_age_days=7):
+        """删除超过max_age_days天未使用的缓存"""
+        expire_time = time.time() - max_age_days * 86400
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.json') and os.path.getmtime(path) < expire_time:
+                os.remove(path)
+                removed += 1
+        return removed
@@ -0,0 +1,114 @@
+"""
+播放列表增量
+功能：每次运行在播放列表旁写出本次的增量文件（如 output/full.txt -> output/full.delta.3.json），
+      并更新增量索引（output/full.delta.json）。增量文件包含：
+        added/removed：本次相对上次运行新增和删除的 (分组名, 名称, URL)，按集合求差得到，便于查看变化；
+        ops：把上次的文件逐行改成本次文件的编辑操作 [起始行, 删除行数, 插入的行]（行号相对上次的文件，升序），
+             保留行的顺序和重复行，应用后与本次文件逐字节相同（应用方法见apply_delta）。
+      索引记录当前代数（generation）、当前文件的SHA-256和最近DELTA_HISTORY代的增量列表。
+      客户端：本地文件的SHA-256等于索引中的sha256时已是最新；否则从base_sha256等于本地文件SHA-256的那一代起，
+      按代数顺序逐个应用增量，每步应用后用该增量的sha256校验；找不到这样的增量（落后超过保留的代数、本地文件被修改）
+      或校验失败时重新下载完整文件。
+      内容没有变化时不写新的增量，代数不变；超出保留范围的旧增量文件在写入新增量时删除。
+"""
+
+import difflib
+import json
+import os
+
+from channel import playlist_entries
+from output_publisher import file_digest
+
+DELTA_HISTORY = max(1, int(os.environ.get('DELTA_HISTORY', 14)))  # 保留的增量代数（每天两次运行，默认一周）
+
+def index_path(path):
+    """播放列表对应的增量索引路径"""
+    return os.path.splitext(path)[0] + '.delta.json'
+
+def delta_path(path, generation):
+    """播放列表某一代的增量文件路径"""
+    return f"{os.path.splitext(path)[0]}.delta.{generation}.json"
+
+def read_playlist(path):
+    """读取播放列表：返回 (文件内容, SHA-256)，文件不存在时返回 (None, None)"""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None, None
+    return text, file_digest(path)
+
+def read_index(path):
+    """读取上次的增量索引，没有时为空字典"""
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def diff_entries(old_entries, new_entries):
+    """按集合求差：返回 (新增, 删除)，各自保持在所属文件中的顺序"""
+    old_set, new_set = set(old_entries), set(new_entries)
+    added = [entry for entry in dict.fromkeys(new_entries) if entry not in old_set]
+    removed = [entry for entry in dict.fromkeys(old_entries) if entry not in new_set]
+    return added, removed
+
+def line_ops(old_lines, new_lines):
+    """逐行比较，返回把old_lines改成new_lines的编辑操作 [[起始行, 删除行数, 插入的行]]（行号相对old_lines，升序）"""
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [[i1, i2 - i1, new_lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+def apply_delta(text, delta):
+    """把增量应用到上一代的文件内容上，返回本代的文件内容（按行号从大到小替换，前面的行号不受影响）"""
+    lines = text.split('\n')
+    for start, count, inserted in reversed(delta['ops']):
+        lines[start:start + count] = inserted
+    return '\n'.join(lines)
+
+def write_delta(publisher, path, previous, generated_at, history=DELTA_HISTORY):
+    """
+    比较上次（previous为read_playlist的结果，需在覆盖前读取）和刚写出的播放列表，写出本次的增量文件并更新索引
+    :return: (新增数, 删除数, 代数)；文件内容没有变化时不写，返回上次的代数
+    """
+    old_text, old_digest = previous
+    new_text, new_digest = read_playlist(path)
+    index = read_index(path)
+    generation = index.get('generation', 0)
+    if new_digest == old_digest:
+        return 0, 0, generation
+    generation += 1
+    # 索引与上次的文件不一致（如文件被替换过）时，旧的增量接不到本次的文件上，一并丢弃
+    deltas = index.get('deltas', []) if index.get('sha256') == old_digest else []
+    added, removed = [], []
+    if old_text is not None:
+        old_lines, new_lines = old_text.split('\n'), new_text.split('\n')
+        added, removed = diff_entries(playlist_entries(old_lines), playlist_entries(new_lines))
+        delta = {
+            'file': os.path.basename(path),
+            'generation': generation,
+            'base_generation': generation - 1,
+            'base_sha256': old_digest,
+            'sha256': new_digest,
+            'generated_at': generated_at,
+            'added': added,
+            'removed': removed,
+            'ops': line_ops(old_lines, new_lines),
+        }
+        with publisher.open(delta_path(path, generation)) as f:
+            json.dump(delta, f, ensure_ascii=False, separators=(',', ':'))
+        deltas.append({'generation': generation, 'base_sha256': old_digest, 'sha256': new_digest,
+                       'file': os.path.basename(delta_path(path, generation))})
+    for expired in deltas[:-history]:
+        expired_path = os.path.join(os.path.dirname(path), expired['file'])
+        if os.path.exists(expired_path):
+            os.remove(expired_path)
+    index = {
+        'file': os.path.basename(path),
+        'generation': generation,
+        'sha256': new_digest,
+        'generated_at': generated_at,
+        'deltas': deltas[-history:],
+    }
+    with publisher.open(index_path(path)) as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    return len(added), len(removed), generation
@@ -0,0 +1,517 @@
+"""
+订阅源异步下载引擎
+功能：基于asyncio的HTTP/1.1客户端，按主机复用keep-alive连接，
+      限制全局并发数和单主机并发数，按原始顺序返回批量下载结果。
+      传输层可替换（如LocalTransport把请求转发到本地替身服务器，便于测试）。
+      自动协商gzip/deflate/br压缩传输，并在读取时流式解压。
+      快照模式：SNAPSHOT_MODE=record 时把每个下载的响应体保存到快照目录，
+      SNAPSHOT_MODE=replay 时从快照目录回放响应，完全不访问网络（便于离线复现和性能对比）。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import ssl
+import threading
+import zlib
+from urllib.parse import urlsplit, urljoin, quote
+
+try:
+    import brotli  # 可选依赖：安装后支持br压缩
+except ImportError:
+    brotli = None
+
+# 全局并发数与单主机并发数（可通过环境变量覆盖）
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 8))
+FETCH_PER_HOST = int(os.environ.get('FETCH_PER_HOST', 2))
+
+# 快照模式（record/replay，为空时正常下载）与快照目录
+SNAPSHOT_MODE = os.environ.get('SNAPSHOT_MODE', '')
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', 'scripts/livesource/snapshot')
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+CHUNK_SIZE = 64 * 1024      # 单次读取的字节数
+MAX_REDIRECTS = 5           # 最大重定向次数
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+class FetchError(Exception):
+    """下载错误（HTTP错误码或协议错误）"""
+
+def get_host(url):
+    """获取URL的主机名（含端口）"""
+    return urlsplit(url).netloc.lower()
+
+# ======= 传输层 =======
+
+class Transport:
+    """默认传输层：直接连接目标主机，https使用TLS"""
+
+    def __init__(self, ssl_context=None):
+        self.ssl_context = ssl_context or ssl.create_default_context()
+
+    async def open_connection(self, scheme, host, port):
+        """建立连接，返回(reader, writer)"""
+        if scheme == 'https':
+            return await asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+class LocalTransport(Transport):
+    """本地替身传输层：把连接转发到本地服务器（明文HTTP），Host头保持原主机名"""
+
+    def __init__(self, port, host='127.0.0.1'):
+        super().__init__()
+        self.local_host = host
+        self.local_port = port
+
+    async def open_connection(self, scheme, host, port):
+        return await asyncio.open_connection(self.local_host, self.local_port)
+
+# ======= 压缩传输 =======
+
+class ContentDecoder:
+    """按Content-Encoding流式解压响应体（gzip/deflate/br）"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding in ('gzip', 'x-gzip'):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = None  # 首个数据块到达时判断是zlib格式还是原始deflate
+        elif encoding == 'br' and brotli is not None:
+            self._obj = brotli.Decompressor()
+        else:
+            raise FetchError(f"不支持的内容编码: {encoding}")
+
+    def decompress(self, data):
+        if self.encoding == 'br':
+            return self._obj.process(data)
+        if self._obj is None:
+            try:
+                obj = zlib.decompressobj()
+                result = obj.decompress(data)
+                self._obj = obj
+                return result
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(data)
+
+    def flush(self):
+        if self.encoding == 'br' or self._obj is None:
+            return b''
+        return self._obj.flush()
+
+def get_content_decoders(headers):
+    """根据响应头生成解压器列表（按解压顺序），未压缩时为空列表"""
+    encodings = [e.strip().lower() for e in headers.get('content-encoding', '').split(',')]
+    return [ContentDecoder(e) for e in reversed(encodings) if e not in ('', 'identity')]
+
+async def consume(consumer, chunk):
+    """把数据块交给流式消费函数，其返回可等待对象时等待完成"""
+    pending = consumer(chunk)
+    if pending is not None:
+        await pending
+
+# ======= 响应对象 =======
+
+class Response:
+    """HTTP响应"""
+
+    def __init__(self, url, status, reason, headers, body=b''):
+        self.url = url            # 最终URL（重定向之后）
+        self.status = status
+        self.reason = reason
+        self.headers = headers    # 小写键名的字典
+        self.body = body
+        self.raw_bytes = 0        # 传输的（压缩）字节数
+        self.body_bytes = 0       # 解压后的字节数
+
+    def raise_for_status(self):
+        """非2xx状态码时抛出FetchError"""
+        if not 200 <= self.status < 300:
+            raise FetchError(f"HTTP Error {self.status}: {self.reason}")
+
+# ======= 下载引擎 =======
+
+class FetchEngine:
+    """异步下载引擎：连接池 + 并发限制，提供同步调用接口"""
+
+    def __init__(self, transport=None, max_workers=FETCH_WORKERS, per_host=FETCH_PER_HOST,
+                 user_agent=DEFAULT_USER_AGENT):
+        self.transport = transport or Transport()
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.user_agent = user_agent
+        self._pool = {}              # (scheme, host, port) -> [(reader, writer), ...] 空闲连接
+        self._host_semaphores = {}
+        self._global_semaphore = None
+        self._loop = None
+        self._thread = None
+        self.connections_opened = 0  # 新建连接数
+        self.connections_reused = 0  # 复用连接数
+
+    # ----- 事件循环（后台线程） -----
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+
+    def run(self, coro):
+        """在引擎的事件循环中执行协程，同步等待结果"""
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self):
+        """关闭所有空闲连接并停止事件循环"""
+        if self._loop is None:
+            return
+        self.run(self._close_pool())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    # ----- 连接池 -----
+
+    async def _close_pool(self):
+        for connections in self._pool.values():
+            for _, writer in connections:
+                writer.close()
+        self._pool.clear()
+
+    async def _acquire(self, key):
+        """获取连接：优先复用空闲连接，返回(reader, writer, 是否复用)"""
+        idle = self._pool.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.connections_reused += 1
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        reader, writer = await self.transport.open_connection(scheme, host, port)
+        self.connections_opened += 1
+        return reader, writer, False
+
+    def _release(self, key, reader, writer, keep_alive):
+        if keep_alive and not writer.is_closing():
+            self._pool.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+
+    def _semaphores(self, host):
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_workers)
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._global_semaphore, self._host_semaphores[host]
+
+    # ----- HTTP/1.1 协议 -----
+
+    def _build_request(self, parts, headers):
+        path = quote(parts.path or '/', safe="/%:@!$&'()*+,;=-._~")
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = {'Host': parts.netloc, 'User-Agent': self.user_agent,
+                           'Accept': '*/*', 'Accept-Encoding': ACCEPT_ENCODING, 'Connection': 'keep-alive'}
+        request_headers.update(headers or {})
+        lines = [f"GET {path} HTTP/1.1"] + [f"{k}: {v}" for k, v in request_headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+    async def _read_head(self, reader):
+        """读取状态行和响应头"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("连接已被服务器关闭")
+        parts = status_line.decode('latin-1').strip().split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise FetchError(f"无效的状态行: {status_line!r}")
+        version, status, reason = parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ''
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        return version, status, reason, headers
+
+    async def _iter_body(self, reader, status, headers):
+        """按块读取响应体（支持chunked、Content-Length和读到连接关闭）"""
+        if status in (204, 304) or 100 <= status < 200:
+            return
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            # 连接中途关闭时报错，不能把截断的响应体当作完整响应（否则会连同ETag一起被缓存）
+            while True:
+                size_line = await reader.readline()
+                if not size_line.endswith(b'\n'):
+                    raise FetchError("chunked响应体不完整：连接在块大小行处关闭")
+                try:
+                    size = int(size_line.split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise FetchError(f"无效的块大小行: {size_line!r}") from None
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass  # 跳过trailer
+                    return
+                try:
+                    while size > 0:
+                        data = await reader.readexactly(min(size, CHUNK_SIZE))
+                        size -= len(data)
+                        yield data
+                    chunk_end = await reader.readexactly(2)
+                except asyncio.IncompleteReadError:
+                    raise FetchError("chunked响应体不完整：连接在块数据中途关闭") from None
+                if chunk_end != b'\r\n':
+                    raise FetchError(f"chunked块结尾缺少CRLF: {chunk_end!r}")
+        elif 'content-length' in headers:
+            remaining = int(headers['content-length'])
+            while remaining > 0:
+                data = await reader.read(min(remaining, CHUNK_SIZE))
+                if not data:
+                    raise FetchError(f"响应体不完整，缺少 {remaining} 字节")
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    return
+                yield data
+
+    async def _iter_decoded(self, reader, response):
+        """读取响应体并流式解压，同时统计压缩前后的字节数"""
+        decoders = get_content_decoders(response.headers)
+        async for chunk in self._iter_body(reader, response.status, response.headers):
+            response.raw_bytes += len(chunk)
+            for decoder in decoders:
+                chunk = decoder.decompress(chunk)
+            if chunk:
+                response.body_bytes += len(chunk)
+                yield chunk
+        for i, decoder in enumerate(decoders):
+            # 依次冲刷剩余数据，并交给后续解压器
+            chunk = decoder.flush()
+            for next_decoder in decoders[i + 1:]:
+                chunk = next_decoder.decompress(chunk)
+            if chunk:
+                response.body_bytes += len(chunk)
+                yield chunk
+
+    def _keep_alive(self, version, headers):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        if 'content-length' not in headers and 'chunked' not in headers.get('transfer-encoding', '').lower():
+            return False  # 读到连接关闭才结束的响应不能复用
+        return connection != 'close'
+
+    async def _request(self, url, headers, on_response=None):
+        """发送一次GET请求（不处理重定向，并发名额由fetch()获取），on_response见fetch()"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise FetchError(f"不支持的协议: {url}")
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        request = self._build_request(parts, headers)
+        for attempt in range(2):
+            reader, writer, reused = await self._acquire(key)
+            try:
+                writer.write(request)
+                await writer.drain()
+                version, status, reason, response_headers = await self._read_head(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and attempt == 0:
+                    continue  # 空闲连接已被服务器关闭，换新连接重试
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            response = Response(url, status, reason, response_headers)
+            is_redirect = status in REDIRECT_CODES and 'location' in response_headers
+            consumer = on_response(response) if on_response and not is_redirect else None
+            try:
+                if consumer:
+                    # 流式模式：每个数据块到达即交给consumer，不在内存中累积响应体
+                    async for chunk in self._iter_decoded(reader, response):
+                        await consume(consumer, chunk)
+                else:
+                    response.body = b''.join([chunk async for chunk in self._iter_decoded(reader, response)])
+            except BaseException:
+                writer.close()
+                raise
+            self._release(key, reader, writer, self._keep_alive(version, response_headers))
+            return response
+
+    async def fetch(self, url, headers=None, timeout=None, on_response=None):
+        """
+        下载URL（自动跟随重定向）
+        先获取全局和该主机的并发名额（重定向到其他主机时仍占用这两个名额），之后才开始计时：
+        排队等待其他下载的时间不计入本源的时间预算
+        :param timeout: 整个请求的超时秒数（None为不限时，0表示已无时间，立即超时），
+                        或接收url返回超时秒数的函数（在获取名额后调用，如按运行截止时间剩余时间封顶的预算）
+        :param on_response: 收到最终响应头时调用 on_response(response)；
+                            返回一个函数时，响应体按块流式传给该函数（response.body保持为空），
+                            该函数返回可等待对象时，等待完成后才读取下一块（处理跟不上时对该连接形成背压）；
+                            返回None时照常读取完整响应体
+        """
+        async def follow():
+            current = url
+            for _ in range(MAX_REDIRECTS + 1):
+                response = await self._request(current, headers, on_response)
+                location = response.headers.get('location')
+                if response.status not in REDIRECT_CODES or not location:
+                    return response
+                current = urljoin(current, location)
+            raise FetchError(f"重定向次数过多: {url}")
+        global_semaphore, host_semaphore = self._semaphores(get_host(url))
+        async with global_semaphore, host_semaphore:
+            if callable(timeout):
+                timeout = timeout(url)
+            if timeout is not None:
+                return await asyncio.wait_for(follow(), timeout)
+            return await follow()
+
+    async def fetch_many(self, urls, headers=None, timeout=None, on_response=None):
+        """
+        并发下载多个URL，结果顺序与urls一致，失败项为异常对象
+        :param headers: 请求头字典，或接收url返回请求头字典的函数（如条件请求头）
+        :param timeout: 超时秒数，或接收url返回超时秒数的函数（如按源分配的时间预算，获取并发名额后才调用）
+        :param on_response: 与urls一一对应的on_response回调列表（见fetch()）
+        """
+        callbacks = on_response or [None] * len(urls)
+        tasks = [self.fetch(url, headers(url) if callable(headers) else headers, timeout, callback)
+                 for url, callback in zip(urls, callbacks)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+# ======= 快照录制/回放 =======
+
+# 不写入快照的响应头（快照保存的是解压后的完整响应体）
+SNAPSHOT_SKIP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+class SnapshotArchive:
+    """快照目录：index.json记录 URL -> 状态码、响应头、响应体文件名，响应体按URL的sha1保存"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = os.path.join(path, 'index.json')
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def load(self, url):
+        """读取URL的快照，返回 (元数据, 响应体)，不存在返回None"""
+        meta = self.index.get(url)
+        if meta is None:
+            return None
+        with open(os.path.join(self.path, meta['file']), 'rb') as f:
+            return meta, f.read()
+
+    def save(self, url, response, body):
+        """保存URL的响应（同一URL重复录制时覆盖）"""
+        os.makedirs(self.path, exist_ok=True)
+        file_name = hashlib.sha1(url.encode('utf-8')).hexdigest() + '.body'
+        with open(os.path.join(self.path, file_name), 'wb') as f:
+            f.write(body)
+        self.index[url] = {
+            'status': response.status,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k not in SNAPSHOT_SKIP_HEADERS},
+            'file': file_name,
+        }
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+class RecordingEngine(FetchEngine):
+    """录制模式：正常下载，同时把每个URL的最终响应保存到快照"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    async def fetch(self, url, headers=None, timeout=None, on_response=None):
+        # 去掉条件请求头，保证录到完整响应体而不是304
+        headers = {k: v for k, v in (headers or {}).items()
+                   if k.lower() not in ('if-none-match', 'if-modified-since')}
+        chunks = []
+
+        def record(response):
+            consumer = on_response(response) if on_response else None
+            if consumer is None:
+                return None
+
+            def tee(chunk):
+                chunks.append(chunk)
+                return consumer(chunk)
+            return tee
+
+        response = await super().fetch(url, headers, timeout, record)
+        self.archive.save(url, response, b''.join(chunks) or response.body)
+        return response
+
+class ReplayEngine(FetchEngine):
+    """回放模式：从快照返回响应（响应体按块交给on_response，与正常下载一致），不访问网络"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    async def fetch(self, url, headers=None, timeout=None, on_response=None):
+        snapshot = self.archive.load(url)
+        if snapshot is None:
+            raise FetchError(f"快照中没有该URL: {url}")
+        meta, body = snapshot
+        response = Response(url, meta['status'], meta['reason'], dict(meta['headers']))
+        consumer = on_response(response) if on_response else None
+        if consumer is None:
+            response.body = body
+        for i in range(0, len(body), CHUNK_SIZE):
+            chunk = body[i:i + CHUNK_SIZE]
+            response.raw_bytes += len(chunk)
+            response.body_bytes += len(chunk)
+            if consumer:
+                await consume(consumer, chunk)
+        return response
+
+# ======= 同步接口 =======
+
+_engine = None
+
+def get_engine():
+    """获取进程内共享的下载引擎（按SNAPSHOT_MODE选择录制/回放引擎）"""
+    global _engine
+    if _engine is None:
+        if SNAPSHOT_MODE == 'record':
+            _engine = RecordingEngine(SnapshotArchive(SNAPSHOT_DIR))
+        elif SNAPSHOT_MODE == 'replay':
+            _engine = ReplayEngine(SnapshotArchive(SNAPSHOT_DIR))
+        else:
+            _engine = FetchEngine()
+    return _engine
+
+def set_engine(engine):
+    """替换共享引擎（如使用LocalTransport的引擎）"""
+    global _engine
+    if _engine is not None and _engine is not engine:
+        _engine.close()
+    _engine = engine
+
+def fetch_url(url, headers=None, timeout=None):
+    """同步下载单个URL，返回Response"""
+    engine = get_engine()
+    return engine.run(engine.fetch(url, headers, timeout))
+
+def fetch_all(urls, headers=None, timeout=None, on_response=None):
+    """同步并发下载多个URL，返回与urls顺序一致的列表（Response或异常对象）"""
+    engine = get_engine()
+    return engine.run(engine.fetch_many(urls, headers, timeout, on_response))
@@ -0,0 +1,181 @@
+"""
+订阅源HTTP条件请求缓存
+功能：按URL持久化保存响应体、ETag/Last-Modified和解析后的行列表，
+      下次请求时携带If-None-Match/If-Modified-Since，
+      服务器返回304时直接复用缓存的解析结果。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+class HttpCache:
+    """订阅源HTTP缓存（每个URL对应 .json元数据、.body响应体、.lines解析结果 三个文件）"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entries = {}
+        self.hits = 0      # 304命中次数
+        self.misses = 0    # 重新下载次数
+        self.stale = 0     # 下载失败/超时后回退使用旧缓存的次数
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _write(self, path, data):
+        """先写临时文件再替换，避免中断时留下半个文件"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url):
+        """读取URL的缓存元数据，不存在返回None"""
+        if url not in self._entries:
+            try:
+                with open(self._path(url, '.json'), 'r', encoding='utf-8') as f:
+                    self._entries[url] = json.load(f)
+            except (OSError, ValueError):
+                self._entries[url] = None
+        return self._entries[url]
+
+    def conditional_headers(self, url):
+        """生成条件请求头（无缓存时返回空字典）"""
+        entry = self.get(url)
+        headers = {}
+        if entry and os.path.exists(self._path(url, '.lines')):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _read_lines(self, url):
+        try:
+            with open(self._path(url, '.lines'), 'r', encoding='utf-8') as f:
+                return f.read().split('\n')
+        except OSError:
+            return None
+
+    def get_body_hash(self, url):
+        """读取缓存响应体的sha1，未知返回None"""
+        entry = self.get(url)
+        return entry.get('sha1') if entry else None
+
+    def get_encoding(self, url):
+        """读取URL上次检测到的编码，未知返回None"""
+        entry = self.get(url)
+        return entry.get('encoding') if entry else None
+
+    def get_lines(self, url):
+        """读取缓存的解析结果（行列表），不存在返回None"""
+        lines = self._read_lines(url)
+        if lines is None:
+            return None
+        self.hits += 1
+        os.utime(self._path(url, '.json'))  # 记录最近使用时间
+        return lines
+
+    def get_stale_lines(self, url):
+        """
+        下载失败或超时时读取最近一次成功的解析结果，返回 (行列表, 保存时间戳)，不存在返回None
+        不刷新使用时间，长期只能回退旧缓存的源会被prune()清理
+        """
+        entry = self.get(url)
+        lines = self._read_lines(url) if entry else None
+        if lines is None:
+            return None
+        self.stale += 1
+        return lines, entry.get('stored_at')
+
+    def get_body(self, url):
+        """读取缓存的响应体，不存在返回None"""
+        try:
+            with open(self._path(url, '.body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def begin(self, url):
+        """开始流式写入URL的缓存，返回CacheWriter"""
+        return CacheWriter(self, url)
+
+    def store(self, url, response, lines, encoding=None):
+        """保存响应体、校验头、编码和解析后的行列表"""
+        writer = self.begin(url)
+        writer.write_body(response.body)
+        for line in lines:
+            writer.write_line(line)
+        writer.commit(response, encoding)
+
+    def _commit(self, url, response, body_tmp, lines_tmp, encoding, body_hash):
+        self.misses += 1
+        entry = {
+            'url': url,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'encoding': encoding,
+            'sha1': body_hash,
+            'stored_at': time.time(),
+        }
+        os.replace(body_tmp, self._path(url, '.body'))
+        os.replace(lines_tmp, self._path(url, '.lines'))
+        self._write(self._path(url, '.json'), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        self._entries[url] = entry
+
+    def prune(self, max_age_days=7):
+        """删除超过max_age_days天未使用的缓存（如带日期变量的旧URL）"""
+        expire_time = time.time() - max_age_days * 86400
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            if os.path.getmtime(meta_path) < expire_time:
+                key = name[:-len('.json')]
+                for suffix in ('.json', '.body', '.lines'):
+                    path = os.path.join(self.cache_dir, key + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        return removed
+
+class CacheWriter:
+    """流式缓存写入：边下载边写响应体和解析结果到临时文件，成功后再替换正式文件"""
+
+    def __init__(self, cache, url):
+        self.cache = cache
+        self.url = url
+        self.body_tmp = cache._path(url, '.body.tmp')
+        self.lines_tmp = cache._path(url, '.lines.tmp')
+        self.body_file = open(self.body_tmp, 'wb')
+        self.lines_file = open(self.lines_tmp, 'w', encoding='utf-8')
+        self.first_line = True
+        self.body_hash = hashlib.sha1()  # 响应体哈希，用于判断内容是否逐字节未变
+
+    def write_body(self, data):
+        self.body_file.write(data)
+        self.body_hash.update(data)
+
+    def write_line(self, line):
+        if not self.first_line:
+            self.lines_file.write('\n')
+        self.lines_file.write(line)
+        self.first_line = False
+
+    def commit(self, response, encoding=None):
+        """下载和解析完成，写入缓存（encoding为本次使用的编码，供下次直接使用）"""
+        self.body_file.close()
+        self.lines_file.close()
+        self.cache._commit(self.url, response, self.body_tmp, self.lines_tmp, encoding, self.body_hash.hexdigest())
+
+    def abort(self):
+        """下载失败，丢弃临时文件"""
+        self.body_file.close()
+        self.lines_file.close()
+        for path in (self.body_tmp, self.lines_tmp):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,102 @@
+"""
+订阅源行分类索引
+功能：早晚两次运行中大部分频道行是相同的（只是所在的源内容有增减，整源的分类结果缓存用不上）。
+      按行保存 原始行哈希 -> 分类结果（候选分类、(原始名, 规范化名称, URL)、分类后的显示名和URL），
+      下次运行只分类没见过的行，其余直接复用。
+      版本与分类结果缓存相同（字典文件、名称校正文件、分类代码），任一变化时整个索引失效；
+      黑名单不保存在索引中，合并时按当天的黑名单检查。
+      超过INDEX_MAX_AGE_DAYS天没有出现过的行在保存时清理。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+INDEX_MAX_AGE_DAYS = int(os.environ.get('INDEX_MAX_AGE_DAYS', 7))
+
+def line_key(line):
+    """行的索引键（8字节blake2b的十六进制，比保存原文紧凑）"""
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=8).hexdigest()
+
+def _row(row):
+    candidates, channel, display = row
+    return tuple(candidates), tuple(channel), tuple(display) if display else None
+
+class LineIndex:
+    """行分类索引：键为行哈希，值为 [最近出现的日期序号, 分类结果行列表]"""
+
+    def __init__(self, version, max_age_days=INDEX_MAX_AGE_DAYS):
+        self.version = version
+        self.max_age_days = max_age_days
+        self.today = int(time.time() // 86400)
+        self.entries = {}
+        self.added = {}     # 本进程新分类的行（分类子进程取回后交给主进程合并）
+        self.hits = 0       # 复用的行数
+        self.misses = 0     # 新分类的行数
+        self.loaded = 0     # 从磁盘加载的条目数
+        self.expired = 0    # 保存时清理的过期条目数
+
+    def get(self, key):
+        """查找行的分类结果，没见过时返回None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        entry[0] = self.today
+        return entry[1]
+
+    def put(self, key, rows):
+        """记录新分类的行"""
+        self.misses += 1
+        self.entries[key] = [self.today, rows]
+        self.added[key] = rows
+
+    def touch(self, keys):
+        """整源复用分类结果缓存时，标记这些行本次仍然出现（避免被当作过期清理）"""
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry[0] = self.today
+
+    def drain(self):
+        """取出并清空本进程的新分类行和复用计数：(新分类行, 复用行数)"""
+        added, hits = self.added, self.hits
+        self.added, self.hits, self.misses = {}, 0, 0
+        return added, hits
+
+    def merge(self, added, hits):
+        """合并分类子进程的结果"""
+        for key, rows in added.items():
+            self.entries[key] = [self.today, rows]
+        self.misses += len(added)
+        self.hits += hits
+
+    def load(self, path):
+        """从磁盘加载（版本不同时忽略）"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.version:
+            return
+        self.entries = {key: [day, [_row(row) for row in rows]] for key, (day, rows) in data['entries'].items()}
+        self.loaded = len(self.entries)
+
+    def save(self, path):
+        """清理过期条目后保存到磁盘"""
+        expire_day = self.today - self.max_age_days
+        entries = {key: entry for key, entry in self.entries.items() if entry[0] >= expire_day}
+        self.expired = len(self.entries) - len(entries)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'entries': entries}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return (f"复用 {self.hits} 行, 新分类 {self.misses} 行, 复用率 {rate:.1f}%, "
+                f"加载 {self.loaded} 个, 清理过期 {self.expired} 个, 当前 {len(self.entries) - self.expired} 个")
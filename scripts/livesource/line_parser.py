@@ -0,0 +1,125 @@
+"""
+订阅源流式行解析模块
+功能：对边下载边到达的字节块增量解码、切分成行，
+      并在M3U格式下把 #EXTINF 与URL行配对转换为 "频道名,URL" 格式（跨块边界保持配对状态）。
+      只缓存未完成的半行，内存占用与源大小无关。
+"""
+
+import os
+import re
+from urllib.parse import urlparse
+
+from text_decoder import StreamDecoder
+
+MAX_LINE_LENGTH = 64 * 1024  # 单行最大长度（字符），超长行丢弃，防止缓冲无限增长
+
+TXT_LINE_PATTERN = re.compile(r'^[^,]+,[^\s]+://[^\s]+$')
+
+class M3UConverter:
+    """M3U逐行转换器：记住最近一次 #EXTINF 的频道名，与后续URL行配对"""
+
+    def __init__(self):
+        self.channel_name = ""
+
+    def feed(self, line):
+        """输入一行M3U内容，返回转换得到的TXT行列表"""
+        txt_lines = []
+        # 过滤M3U头信息
+        if line.startswith("#EXTM3U"):
+            return txt_lines
+        # 处理频道信息行
+        if line.startswith("#EXTINF"):
+            self.channel_name = line.split(',')[-1].strip()
+        # 处理URL行
+        elif line.startswith("http") or line.startswith("rtmp") or line.startswith("p3p"):
+            txt_lines.append(f"{self.channel_name},{line.strip()}")
+
+        # 处理格式为txt但后缀为m3u的文件
+        if "#genre#" not in line and "," in line and "://" in line:
+            if TXT_LINE_PATTERN.match(line):
+                txt_lines.append(line)
+        return txt_lines
+
+class LineSplitter:
+    """增量解码并按换行切分，只保留未完成的半行（encoding为None时自动检测编码）"""
+
+    def __init__(self, encoding=None, max_line_length=MAX_LINE_LENGTH):
+        self.decoder = StreamDecoder(encoding)
+        self.max_line_length = max_line_length
+        self.pending = ''
+        self.skipping = False     # 正在丢弃超长行的剩余部分
+        self.dropped_lines = 0    # 因超长被丢弃的行数
+
+    def _split(self, text, final=False):
+        lines = (self.pending + text).split('\n')
+        self.pending = '' if final else lines.pop()
+        if self.skipping and lines:
+            lines.pop(0)          # 超长行的结尾部分
+            self.skipping = False
+        if len(self.pending) > self.max_line_length:
+            if not self.skipping:
+                self.dropped_lines += 1
+            self.pending = ''
+            self.skipping = True
+        return lines
+
+    def feed(self, data):
+        """输入字节块，返回其中已完整的行"""
+        return self._split(self.decoder.decode(data))
+
+    def close(self):
+        """输入结束，返回最后一行（如有）"""
+        return self._split(self.decoder.decode(b'', final=True), final=True)
+
+class SourceLineParser:
+    """
+    订阅源流式解析器：字节块 -> 待分类的 "频道名,URL" 行
+    与整体读取后 text.strip() / M3U转换 / split('\\n') 的结果一致：
+    首个非空行去掉行首空白，最后一个非空行去掉行尾空白，空白行不输出。
+    """
+
+    def __init__(self, url, encoding=None):
+        extension = os.path.splitext(urlparse(url).path)[1]
+        self.is_m3u = extension in (".m3u", ".m3u8")
+        self.splitter = LineSplitter(encoding)
+        self.converter = None
+        self.started = False      # 是否已遇到首个非空行（用于识别格式）
+        self.held_line = None     # 暂存最近的非空行，直到确定它不是最后一行
+
+    @property
+    def encoding(self):
+        """实际使用的编码（检测完成前为None）"""
+        return self.splitter.decoder.encoding
+
+    def _convert(self, line):
+        if self.converter is None:
+            return [line]
+        return self.converter.feed(line)
+
+    def _handle(self, line):
+        if not line.strip():
+            return []
+        if not self.started:
+            self.started = True
+            line = line.lstrip()
+            if self.is_m3u or line.startswith("#EXTM3U") or line.startswith("#EXTINF"):
+                self.converter = M3UConverter()
+        held, self.held_line = self.held_line, line
+        return [] if held is None else self._convert(held)
+
+    def feed(self, data):
+        """输入字节块，返回已可确定的解析结果行"""
+        result = []
+        for line in self.splitter.feed(data):
+            result.extend(self._handle(line))
+        return result
+
+    def close(self):
+        """输入结束，返回剩余的解析结果行"""
+        result = []
+        for line in self.splitter.close():
+            result.extend(self._handle(line))
+        if self.held_line is not None:
+            result.extend(self._convert(self.held_line.rstrip()))
+            self.held_line = None
+        return result
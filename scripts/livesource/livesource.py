@@ -5,22 +5,42 @@
 版本：2025
 """
 
-import urllib.request
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 import re
 import os
+import glob
+import multiprocessing
 from datetime import datetime, timedelta, timezone
 import random
-import opencc
 import socket
 import time
+from fetcher import fetch_all, fetch_url, FETCH_WORKERS, FETCH_PER_HOST
+from http_cache import HttpCache
+from classify_cache import ClassifyCache, files_version
+from line_index import LineIndex, line_key
+from output_publisher import OutputPublisher
+from delta_feed import read_playlist, write_delta
+from category_index import CategoryIndex
+from ac_matcher import AhoCorasick
+from name_cache import NameCache
+from t2s_converter import get_converter
+from token_stripper import TokenStripper
+from channel import Channel, read_channels, playlist_entries
+from channel_table import use_columnar, place_entries, correct_channels, sort_channels
+from scheduler import DeadlineScheduler, load_source_budgets, RUN_DEADLINE
+from line_parser import M3UConverter, SourceLineParser
+from text_decoder import decode_bytes
+from stage_timer import stage_timer
 
 # ======= 工具函数模块 =======
 
+t2s_converter = get_converter('t2s')  # 进程内共享的繁转简转换器
+
 def traditional_to_simplified(text: str) -> str:
     """繁体转简体"""
-    converter = opencc.OpenCC('t2s')
-    return converter.convert(text)
+    return t2s_converter.convert(text)
 
 def read_txt_to_array(file_name):
     """读取文本文件到数组，跳过空行"""
@@ -46,6 +66,31 @@ def read_blacklist_from_txt(file_path):
 timestart = datetime.now()
 print(f"开始时间: {datetime.now().strftime('%Y%m%d_%H_%M_%S')}")
 
+# 流式解析：边下载边解析分类（STREAM_PARSE=0 时下载完成后再整体解析）
+STREAM_PARSE = os.environ.get('STREAM_PARSE', '1') != '0'
+
+# 分类结果缓存和行分类索引（CLASSIFY_CACHE=0 时每次都重新分类，如回放快照测量分类耗时）
+CLASSIFY_CACHE = os.environ.get('CLASSIFY_CACHE', '1') != '0'
+
+# 多进程分类：CLASSIFY_WORKERS>1 时边下载边把订阅源行分块（每块CLASSIFY_CHUNK行）交给进程池分类，
+# 0表示按CPU核数，1为单进程（在分类线程中边下载边分类）；
+# 有分类结果缓存的源最多暂存CLASSIFY_CHUNK行等待确认内容是否变化，超过后开始分类
+CLASSIFY_WORKERS = int(os.environ.get('CLASSIFY_WORKERS', '1')) or os.cpu_count() or 1
+CLASSIFY_CHUNK = int(os.environ.get('CLASSIFY_CHUNK', '5000'))
+
+# 流式下载时解析分类在单独的线程中进行（不占用下载的事件循环），
+# 已下载、等待解析分类的数据块超过CLASSIFY_BACKLOG块（每块64KB）时暂停读取，限制内存占用
+CLASSIFY_BACKLOG = int(os.environ.get('CLASSIFY_BACKLOG', '64'))
+
+# M3U输出的写缓冲大小（字节）
+M3U_WRITE_BUFFER = int(os.environ.get('M3U_WRITE_BUFFER', 1 << 20))
+
+# 输出文件发布：先写临时文件，内容变化时才原子替换
+output_publisher = OutputPublisher()
+
+# 运行截止时间（RUN_DEADLINE）与单源时间预算（REQUEST_TIMEOUT，可在source_budget.txt中按URL或主机名单独配置）
+run_scheduler = DeadlineScheduler(budgets=load_source_budgets('scripts/livesource/source_budget.txt'))
+
 # 读取黑名单
 blacklist_auto = read_blacklist_from_txt('scripts/livesource/blacklist/blacklist_auto.txt')
 blacklist_manual = read_blacklist_from_txt('scripts/livesource/blacklist/blacklist_manual.txt')
@@ -114,20 +159,9 @@ mgss_lines = []         # 咪咕赛事
 zhibozhongguo_lines = [] # 直播中国
 
 other_lines = []        # 其他
-other_lines_url = []    # 其他频道URL（用于去重）
 
 # ======= 频道名称处理函数 =======
 
-def process_name_string(input_str):
-    """处理频道名称字符串"""
-    parts = input_str.split(',')
-    processed_parts = []
-    for part in parts:
-        processed_part = process_part(part)
-        processed_parts.append(processed_part)
-    result_str = ','.join(processed_parts)
-    return result_str
-
 def process_part(part_str):
     """处理单个频道名称部分"""
     # 处理CCTV频道名称
@@ -166,36 +200,32 @@ def get_url_file_extension(url):
 
 def convert_m3u_to_txt(m3u_content):
     """将M3U格式转换为TXT格式"""
-    lines = m3u_content.split('\n')
+    converter = M3UConverter()
     txt_lines = []
-    channel_name = ""
-    
-    for line in lines:
-        # 过滤M3U头信息
-        if line.startswith("#EXTM3U"):
-            continue
-        # 处理频道信息行
-        if line.startswith("#EXTINF"):
-            channel_name = line.split(',')[-1].strip()
-        # 处理URL行
-        elif line.startswith("http") or line.startswith("rtmp") or line.startswith("p3p"):
-            txt_lines.append(f"{channel_name},{line.strip()}")
-        
-        # 处理格式为txt但后缀为m3u的文件
-        if "#genre#" not in line and "," in line and "://" in line:
-            pattern = r'^[^,]+,[^\s]+://[^\s]+$'
-            if bool(re.match(pattern, line)):
-                txt_lines.append(line)
-    
+    for line in m3u_content.split('\n'):
+        txt_lines.extend(converter.feed(line))
     return '\n'.join(txt_lines)
 
 # ======= URL处理和验证 =======
 
-def check_url_existence(data_list, url):
-    """检查URL是否在列表中已存在"""
-    urls = [item.split(',')[1] for item in data_list]
-    return url not in urls  # 如果不存在返回True
+class UrlDedupLines:
+    """分类列表旁维护一个URL集合：按URL去重追加，判断和插入都是O(1)，并统计重复命中次数"""
+
+    def __init__(self, lines):
+        self.lines = lines        # 原分类列表（就地追加频道记录）
+        self.urls = set()
+        self.duplicates = 0       # URL已存在而被拒绝的次数
 
+    def add(self, channel, url):
+        """URL不存在时追加channel并返回True，已存在时返回False"""
+        if url in self.urls:
+            self.duplicates += 1
+            return False
+        self.urls.add(url)
+        self.lines.append(channel)
+        return True
+
+@stage_timer.timed('clean')
 def clean_url(url):
     """清理URL，移除$符号后的内容"""
     last_dollar_index = url.rfind('$')
@@ -211,158 +241,168 @@ removal_list = ["_电信", "电信", "高清", "频道", "（HD）", "-HD", "英
                 "粤陆", "国陆", "肆柒", "频英", "频特", "频国", "频壹", "频贰", "肆贰", "频测", "咪咕", "闽特", "高特", "频高", "频标", "汝阳",
                 "4Gtv", "频效", "国标", "粤标", "频推", "频流", "粤高", "频限", "实时", "美推", "频美"]
 
-def clean_channel_name(channel_name, removal_list):
-    """清理频道名称中的特定字符"""
-    for item in removal_list:
-        channel_name = channel_name.replace(item, "")
+# 末尾后缀规则：以'HD'结尾时移除，以'台'结尾且长度大于3时移除
+name_suffix_rules = [("HD", 0), ("台", 3)]
+name_stripper = TokenStripper(removal_list, name_suffix_rules)
+
+def clean_channel_name(channel_name):
+    """清理频道名称中的特定字符（一次扫描判断是否含有需移除的记号，再处理末尾的'HD'和'台'）"""
+    return name_stripper.strip(channel_name)
+
+def normalize_channel_name(raw_name):
+    """
+    原始频道名 -> (规范化名称, 显示名)
+    规范化名称：名称清理 + 繁转简，用于分类匹配；显示名：再经process_part处理（CCTV编号、卫视后缀），用于分类后的行
+    """
+    channel_name = clean_channel_name(raw_name)  # 清理名称
+    channel_name = traditional_to_simplified(channel_name)  # 繁转简
+    return channel_name, process_part(channel_name.lstrip())
 
-    # 移除末尾的'HD'和'台'
-    if channel_name.endswith("HD"):
-        channel_name = channel_name[:-2]
-    if channel_name.endswith("台") and len(channel_name) > 3:
-        channel_name = channel_name[:-1]
+def normalize_channel_names(raw_names):
+    """批量版normalize_channel_name：逐个清理名称后，一次调用OpenCC批量繁转简"""
+    channel_names = t2s_converter.convert_many([clean_channel_name(raw_name) for raw_name in raw_names])
+    return [(channel_name, process_part(channel_name.lstrip())) for channel_name in channel_names]
 
-    return channel_name
+# 原始频道名规范化缓存（LRU，运行结束保存到磁盘供下次预热）
+name_cache = NameCache(normalize_channel_name)
+cached_channel_name = stage_timer.timed('clean')(name_cache)
 
 # ======= 核心分发逻辑 =======
 
-def process_channel_line(line):
-    """处理单行频道数据并进行分类"""
+@stage_timer.timed('classify')
+def match_categories(channel_name):
+    """根据频道名称匹配所有候选分类（精确匹配查索引，另加子串匹配），按原分发顺序返回"""
+    return category_index.match(channel_name)
+
+def classify_channel_line(line):
+    """
+    对单行频道数据进行分类（只计算结果，不修改分类列表）
+    :return: (候选分类, 频道记录, 分类后的(显示名, URL))，格式不符时返回None
+             频道记录为规范化名称和清理后的URL（未分类时按此放入其他）；没有候选分类时显示名为None
+             候选分类按原分发顺序排列，由add_channel_entry检查黑名单、按URL去重后选定
+             （黑名单每天更新，放在合并时检查，使分类结果可以跨运行缓存）
+    """
     # 检查行格式是否符合要求
     if "#genre#" not in line and "#EXTINF:" not in line and "," in line and "://" in line:
-        channel_name = line.split(',')[0].strip()
-        channel_name = clean_channel_name(channel_name, removal_list)  # 清理名称
-        channel_name = traditional_to_simplified(channel_name)  # 繁转简
-        channel_address = clean_url(line.split(',')[1].strip())  # 清理URL
-        line = channel_name + "," + channel_address  # 重新组织行
-        
-        # 检查是否在黑名单中
-        if channel_address not in combined_blacklist:
-            # 根据频道名称进行分类分发
-            #if "CCTV" in channel_name and check_url_existence(yangshi_lines, channel_address):  # 注释这一行用下面替换
-            if any(cctv_name in channel_name for cctv_name in yangshi_dictionary) and check_url_existence(yangshi_lines, channel_address):
-                yangshi_lines.append(process_name_string(line.strip()))
-            elif channel_name in weishi_dictionary and check_url_existence(weishi_lines, channel_address):
-                weishi_lines.append(process_name_string(line.strip()))
-
-            # 地方台分发逻辑
-            elif channel_name in beijing_dictionary and check_url_existence(beijing_lines, channel_address):
-                beijing_lines.append(process_name_string(line.strip()))
-            elif channel_name in shanghai_dictionary and check_url_existence(shanghai_lines, channel_address):
-                shanghai_lines.append(process_name_string(line.strip()))
-            elif channel_name in tianjin_dictionary and check_url_existence(tianjin_lines, channel_address):
-                tianjin_lines.append(process_name_string(line.strip()))
-            elif channel_name in chongqing_dictionary and check_url_existence(chongqing_lines, channel_address):
-                chongqing_lines.append(process_name_string(line.strip()))
-            elif channel_name in guangdong_dictionary and check_url_existence(guangdong_lines, channel_address):
-                guangdong_lines.append(process_name_string(line.strip()))
-            elif channel_name in jiangsu_dictionary and check_url_existence(jiangsu_lines, channel_address):
-                jiangsu_lines.append(process_name_string(line.strip()))
-            elif channel_name in zhejiang_dictionary and check_url_existence(zhejiang_lines, channel_address):
-                zhejiang_lines.append(process_name_string(line.strip()))
-            elif channel_name in shandong_dictionary and check_url_existence(shandong_lines, channel_address):
-                shandong_lines.append(process_name_string(line.strip()))
-            elif channel_name in henan_dictionary and check_url_existence(henan_lines, channel_address):
-                henan_lines.append(process_name_string(line.strip()))
-            elif channel_name in sichuan_dictionary and check_url_existence(sichuan_lines, channel_address):
-                sichuan_lines.append(process_name_string(line.strip()))
-            elif channel_name in hebei_dictionary and check_url_existence(hebei_lines, channel_address):
-                hebei_lines.append(process_name_string(line.strip()))
-            elif channel_name in hunan_dictionary and check_url_existence(hunan_lines, channel_address):
-                hunan_lines.append(process_name_string(line.strip()))
-            elif channel_name in hubei_dictionary and check_url_existence(hubei_lines, channel_address):
-                hubei_lines.append(process_name_string(line.strip()))
-            elif channel_name in anhui_dictionary and check_url_existence(anhui_lines, channel_address):
-                anhui_lines.append(process_name_string(line.strip()))
-            elif channel_name in fujian_dictionary and check_url_existence(fujian_lines, channel_address):
-                fujian_lines.append(process_name_string(line.strip()))
-            elif channel_name in shanxi1_dictionary and check_url_existence(shanxi1_lines, channel_address):
-                shanxi1_lines.append(process_name_string(line.strip()))
-            elif channel_name in liaoning_dictionary and check_url_existence(liaoning_lines, channel_address):
-                liaoning_lines.append(process_name_string(line.strip()))
-            elif channel_name in jiangxi_dictionary and check_url_existence(jiangxi_lines, channel_address):
-                jiangxi_lines.append(process_name_string(line.strip()))
-            elif channel_name in heilongjiang_dictionary and check_url_existence(heilongjiang_lines, channel_address):
-                heilongjiang_lines.append(process_name_string(line.strip()))
-            elif channel_name in jilin_dictionary and check_url_existence(jilin_lines, channel_address):
-                jilin_lines.append(process_name_string(line.strip()))
-            elif channel_name in shanxi2_dictionary and check_url_existence(shanxi2_lines, channel_address):
-                shanxi2_lines.append(process_name_string(line.strip()))
-            elif channel_name in guangxi_dictionary and check_url_existence(guangxi_lines, channel_address):
-                guangxi_lines.append(process_name_string(line.strip()))
-            elif channel_name in yunnan_dictionary and check_url_existence(yunnan_lines, channel_address):
-                yunnan_lines.append(process_name_string(line.strip()))
-            elif channel_name in guizhou_dictionary and check_url_existence(guizhou_lines, channel_address):
-                guizhou_lines.append(process_name_string(line.strip()))
-            elif channel_name in gansu_dictionary and check_url_existence(gansu_lines, channel_address):
-                gansu_lines.append(process_name_string(line.strip()))
-            elif channel_name in neimenggu_dictionary and check_url_existence(neimenggu_lines, channel_address):
-                neimenggu_lines.append(process_name_string(line.strip()))
-            elif channel_name in xinjiang_dictionary and check_url_existence(xinjiang_lines, channel_address):
-                xinjiang_lines.append(process_name_string(line.strip()))
-            elif channel_name in hainan_dictionary and check_url_existence(hainan_lines, channel_address):
-                hainan_lines.append(process_name_string(line.strip()))
-            elif channel_name in ningxia_dictionary and check_url_existence(ningxia_lines, channel_address):
-                ningxia_lines.append(process_name_string(line.strip()))
-            elif channel_name in qinghai_dictionary and check_url_existence(qinghai_lines, channel_address):
-                qinghai_lines.append(process_name_string(line.strip()))
-            elif channel_name in xizang_dictionary and check_url_existence(xizang_lines, channel_address):
-                xizang_lines.append(process_name_string(line.strip()))
-
-            # 主频道分发逻辑
-            elif channel_name in news_dictionary and check_url_existence(news_lines, channel_address):
-                news_lines.append(process_name_string(line.strip()))
-            elif channel_name in shuzi_dictionary and check_url_existence(shuzi_lines, channel_address):
-                shuzi_lines.append(process_name_string(line.strip()))
-            elif channel_name in dianying_dictionary and check_url_existence(dianying_lines, channel_address):
-                dianying_lines.append(process_name_string(line.strip()))
-            elif channel_name in jieshuo_dictionary and check_url_existence(jieshuo_lines, channel_address):
-                jieshuo_lines.append(process_name_string(line.strip()))
-            elif channel_name in zongyi_dictionary and check_url_existence(zongyi_lines, channel_address):
-                zongyi_lines.append(process_name_string(line.strip()))
-            elif channel_name in huya_dictionary and check_url_existence(huya_lines, channel_address):
-                huya_lines.append(process_name_string(line.strip()))
-            elif channel_name in douyu_dictionary and check_url_existence(douyu_lines, channel_address):
-                douyu_lines.append(process_name_string(line.strip()))
-            elif channel_name in xianggang_dictionary and check_url_existence(xianggang_lines, channel_address):
-                xianggang_lines.append(process_name_string(line.strip()))
-            elif channel_name in aomen_dictionary and check_url_existence(aomen_lines, channel_address):
-                aomen_lines.append(process_name_string(line.strip()))
-            elif channel_name in china_dictionary and check_url_existence(china_lines, channel_address):
-                china_lines.append(process_name_string(line.strip()))
-            elif channel_name in guoji_dictionary and check_url_existence(guoji_lines, channel_address):
-                guoji_lines.append(process_name_string(line.strip()))
-            elif channel_name in gangaotai_dictionary and check_url_existence(gangaotai_lines, channel_address):
-                gangaotai_lines.append(process_name_string(line.strip()))
-            elif channel_name in dianshiju_dictionary and check_url_existence(dianshiju_lines, channel_address):
-                dianshiju_lines.append(process_name_string(line.strip()))
-            elif channel_name in radio_dictionary and check_url_existence(radio_lines, channel_address):
-                radio_lines.append(process_name_string(line.strip()))
-            elif channel_name in donghuapian_dictionary and check_url_existence(donghuapian_lines, channel_address):
-                donghuapian_lines.append(process_name_string(line.strip()))
-            elif channel_name in jilupian_dictionary and check_url_existence(jilupian_lines, channel_address):
-                jilupian_lines.append(process_name_string(line.strip()))
-            elif channel_name in tiyu_dictionary and check_url_existence(tiyu_lines, channel_address):
-                tiyu_lines.append(process_name_string(line.strip()))
-            elif channel_name in youxi_dictionary and check_url_existence(youxi_lines, channel_address):
-                youxi_lines.append(process_name_string(line.strip()))
-            elif channel_name in xiqu_dictionary and check_url_existence(xiqu_lines, channel_address):
-                xiqu_lines.append(process_name_string(line.strip()))
-            elif channel_name in yinyue_dictionary and check_url_existence(yinyue_lines, channel_address):
-                yinyue_lines.append(process_name_string(line.strip()))
-            elif channel_name in chunwan_dictionary and check_url_existence(chunwan_lines, channel_address):
-                chunwan_lines.append(process_name_string(line.strip()))
-            elif any(tyss_dictionary in channel_name for tyss_dictionary in tyss_dictionary) and check_url_existence(tyss_lines, channel_address):  #体育赛事（2025新增）
-                tyss_lines.append(process_name_string(line.strip()))
-            elif any(mgss_dictionary in channel_name for mgss_dictionary in mgss_dictionary) and check_url_existence(mgss_lines, channel_address):  #咪咕赛事（2025新增）
-                mgss_lines.append(process_name_string(line.strip()))
-            elif channel_name in zhibozhongguo_dictionary and check_url_existence(zhibozhongguo_lines, channel_address):
-                zhibozhongguo_lines.append(process_name_string(line.strip()))
-            else:
-                # 未分类的频道放入其他
-                if channel_address not in other_lines_url:
-                    other_lines_url.append(channel_address)
-                    other_lines.append(line.strip())
+        parts = line.split(',')
+        raw_name = parts[0].strip()
+        channel_name, display_name = cached_channel_name(raw_name)  # 清理名称、繁转简
+        channel_address = clean_url(parts[1].strip()).rstrip()  # 清理URL
+        channel = Channel(raw_name, channel_name.lstrip(), channel_address)
+
+        candidates = match_categories(channel_name)
+        # 分类后：名称和URL分别经process_part处理（名称部分已缓存为显示名）
+        display = (display_name, process_part(channel_address)) if candidates else None
+        return candidates, channel, display
+    return None
+
+def add_channel_entry(entry, source=None, latency=None):
+    """
+    把分类结果加入分类列表：放入第一个尚未包含该URL的候选分类，都不满足时放入其他
+    （分类结果只合并一次，直接在频道记录上填写分类、来源和显示名，不再另建记录）
+    """
+    candidates, channel, display = entry
+    # 检查是否在黑名单中
+    if channel.url in combined_blacklist:
+        return
+    for category in candidates:
+        dedup = category_dedup[category]
+        if channel.url in dedup.urls:
+            dedup.duplicates += 1
+            continue
+        # 集合中记录分类后的URL（与原先逐行取第二段比较的口径一致）
+        channel.name, channel.url = display
+        channel.category, channel.source, channel.latency = category, source, latency
+        dedup.add(channel, channel.url)
+        return
+    # 未分类的频道放入其他
+    channel.category, channel.source, channel.latency = 'other', source, latency
+    other_dedup.add(channel, channel.url)
+
+def process_channel_line(line, latency=None):
+    """处理单行频道数据并进行分类"""
+    entry = classify_channel_line(line)
+    if entry is not None:
+        add_channel_entry(entry, latency=latency)
+
+def classify_source_line(line):
+    """分类订阅源中的一行，返回分类结果列表"""
+    return [(candidates, Channel(*channel), display) for candidates, channel, display in source_line_rows(line)]
+
+def source_line_rows(line):
+    """
+    分类订阅源中的一行（过滤无效行，拆分#分隔的加速源），返回 [(候选分类, (原始名, 名称, URL), 显示)]
+    先查行分类索引，没见过的行才分类并记入索引
+    """
+    # 过滤无效行：不包含分类标记，包含逗号和协议，排除tvbus和组播
+    if "#genre#" not in line and "," in line and "://" in line and "tvbus://" not in line and "/udp/" not in line:
+        if not CLASSIFY_CACHE:
+            return classify_valid_line(line)
+        key = line_key(line)
+        rows = line_index.get(key)
+        if rows is None:
+            rows = classify_valid_line(line)
+            line_index.put(key, rows)
+        return rows
+    return []
+
+@stage_timer.timed('clean')
+def prime_channel_names(lines):
+    """
+    分类一块订阅源行之前，把其中尚未缓存的原始频道名批量规范化后填入名称缓存（之后逐行分类时直接命中）；
+    已在行分类索引中的行不会再分类，跳过
+    """
+    raw_names = []
+    for line in lines:
+        if "#genre#" not in line and "," in line and "://" in line and "tvbus://" not in line and "/udp/" not in line:
+            if CLASSIFY_CACHE and line_key(line) in line_index.entries:
+                continue
+            raw_names.append(line.split(',', 1)[0].strip())
+    name_cache.fill(raw_names, normalize_channel_names)
+
+def classify_valid_line(line):
+    """分类一行有效的订阅源行（加速源拆分后逐个分类）"""
+    rows = []
+    # 拆分成频道名和URL部分
+    channel_name, channel_address = line.split(',', 1)
+    # 处理加速源（包含#号的多个URL）
+    if "#" not in channel_address:
+        channel_lines = [line]  # 普通源直接处理
+    else:
+        # 加速源按#分隔后分别处理
+        channel_lines = [f'{channel_name},{channel_url}' for channel_url in channel_address.split('#')]
+    for channel_line in channel_lines:
+        entry = classify_channel_line(channel_line)
+        if entry is not None:
+            candidates, channel, display = entry
+            rows.append((candidates, (channel.raw_name, channel.name, channel.url), display))
+    return rows
+
+def classify_chunk(lines):
+    """
+    分类进程池的任务：分类一块订阅源行，返回 (分类结果, 新分类的行, 复用索引的行数)
+    频道记录以 (原始名, 名称, URL) 元组传回主进程（与分类缓存的格式相同，比直接pickle记录对象快得多）；
+    行分类索引在fork时从主进程继承，新分类的行交回主进程合并
+    """
+    prime_channel_names(lines)
+    rows = [row for line in lines for row in source_line_rows(line)]
+    return (rows, *line_index.drain())
+
+def init_classify_worker():
+    """分类进程初始化：分类索引、名称清理器在fork时从主进程继承，这里只加载一次OpenCC词典"""
+    t2s_converter.converter
+
+def start_classify_pool(workers):
+    """
+    启动分类进程池（fork方式，子进程直接继承已构建的分类索引和名称清理器，每个进程只初始化一次）
+    workers<=1 或系统不支持fork时返回None，在主进程中分类
+    """
+    if workers <= 1:
+        return None
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("当前系统不支持fork，使用单进程分类")
+        return None
+    return multiprocessing.get_context('fork').Pool(workers, initializer=init_classify_worker)
 
 # ======= 网络请求相关 =======
 
@@ -383,17 +423,15 @@ def get_http_response(url, timeout=8, retries=2, backoff_factor=1.0):
     }
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                data = response.read()
-                return data.decode('utf-8')
-        except urllib.error.HTTPError as e:
-            print(f"[HTTPError] Code: {e.code}, URL: {url}")
-            break  # HTTP错误不会在重试中恢复
-        except urllib.error.URLError as e:
-            print(f"[URLError] Reason: {e.reason}, Attempt: {attempt + 1}")
-        except socket.timeout:
+            response = fetch_url(url, headers=headers, timeout=timeout)
+            if not 200 <= response.status < 300:
+                print(f"[HTTPError] Code: {response.status}, URL: {url}")
+                break  # HTTP错误不会在重试中恢复
+            return decode_bytes(response.body)[0]
+        except (asyncio.TimeoutError, socket.timeout):
             print(f"[Timeout] URL: {url}, Attempt: {attempt + 1}")
+        except OSError as e:
+            print(f"[URLError] Reason: {e}, Attempt: {attempt + 1}")
         except Exception as e:
             print(f"[Exception] {type(e).__name__}: {e}, Attempt: {attempt + 1}")
         
@@ -403,48 +441,211 @@ def get_http_response(url, timeout=8, retries=2, backoff_factor=1.0):
     
     return None  # 所有尝试失败后返回None
 
-def process_url(url):
-    """处理单个URL源"""
-    try:
-        other_lines.append("◆◆◆　" + url)  # 在other中标记处理的URL
-        
-        # 创建请求对象
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3')
-
-        # 打开URL并读取内容
-        with urllib.request.urlopen(req) as response:
-            data = response.read()
-            text = data.decode('utf-8')
-            text = text.strip()
-
-            # 处理M3U格式
-            is_m3u = text.startswith("#EXTM3U") or text.startswith("#EXTINF")
-            if get_url_file_extension(url) == ".m3u" or get_url_file_extension(url) == ".m3u8" or is_m3u:
-                text = convert_m3u_to_txt(text)
-
-            # 逐行处理内容
-            lines = text.split('\n')
-            print(f"行数: {len(lines)}")
-            for line in lines:
-                # 过滤无效行：不包含分类标记，包含逗号和协议，排除tvbus和组播
-                if "#genre#" not in line and "," in line and "://" in line and "tvbus://" not in line and "/udp/" not in line:
-                    # 拆分成频道名和URL部分
-                    channel_name, channel_address = line.split(',', 1)
-                    # 处理加速源（包含#号的多个URL）
-                    if "#" not in channel_address:
-                        process_channel_line(line)  # 普通源直接处理
-                    else: 
-                        # 加速源按#分隔后分别处理
-                        url_list = channel_address.split('#')
-                        for channel_url in url_list:
-                            newline = f'{channel_name},{channel_url}'
-                            process_channel_line(newline)
-
-            other_lines.append('\n')  # URL处理完成分隔符
+class SourceStream:
+    """
+    单个订阅源的流式处理：边下载边解析、分类，结果暂存在本源的entries中，最后按源顺序合并
+    下载的数据块交给分类线程处理（feed只排队，不在下载的事件循环中做解析分类）
+    有上次的分类结果缓存时先暂存解析出的行（最多CLASSIFY_CHUNK行）：下载完成后响应体哈希相同则直接复用缓存的分类结果，
+    暂存超过上限时不再等待，开始边下载边分类（哈希相同时丢弃已分类的结果，仍复用缓存）
+    多进程分类时每满CLASSIFY_CHUNK行提交一块到进程池，wait()取回结果
+    """
 
-    except Exception as e:
-        print(f"处理URL时发生错误：{e}")
+    def __init__(self, url):
+        self.url = url
+        self.parser = SourceLineParser(url, http_cache.get_encoding(url))  # 沿用上次检测到的编码
+        self.entries = []
+        self.line_count = 0
+        self.cache_writer = None
+        self.cached = classify_cache.get(url) if CLASSIFY_CACHE else None  # (响应体哈希, 分类结果) 或None
+        self.deferring = self.cached is not None  # 是否暂缓分类（可能整源复用缓存的分类结果）
+        self.pending_lines = []  # 尚未分类的行
+        self.body_hash = None
+        self.jobs = []  # 进程池中的分类任务（按块顺序）
+        self.error = None  # 分类线程中处理数据块时的异常
+
+    def on_response(self, response):
+        """收到响应头：2xx时开始写缓存，流式模式下返回feed逐块处理响应体"""
+        if 200 <= response.status < 300:
+            self.cache_writer = http_cache.begin(self.url)
+            return self.feed if STREAM_PARSE else None
+        return None
+
+    async def feed(self, data):
+        """一个数据块到达（在下载的事件循环中调用）：排队交给分类线程，积压过多时等待"""
+        await classify_backlog.acquire()
+        future = asyncio.get_running_loop().run_in_executor(classify_thread, self._feed, data)
+        future.add_done_callback(lambda _: classify_backlog.release())
+
+    def _feed(self, data):
+        """处理一个数据块（分类线程中按到达顺序执行）"""
+        if self.error is not None:
+            return
+        try:
+            self.cache_writer.write_body(data)
+            with stage_timer.stage('parse'):
+                lines = self.parser.feed(data)
+            self._add_lines(lines)
+        except Exception as e:
+            self.error = e
+
+    def _add_lines(self, lines):
+        for line in lines:
+            self.line_count += 1
+            if self.cache_writer:
+                self.cache_writer.write_line(line)
+        self.pending_lines.extend(lines)
+        if self.deferring:
+            if len(self.pending_lines) < CLASSIFY_CHUNK:
+                return
+            self.deferring = False  # 暂存已满，开始边下载边分类
+        self._classify_pending()
+
+    def _classify_pending(self, final=False):
+        """分类暂存的行：多进程时把满CLASSIFY_CHUNK行的块（final时包括剩余的行）提交到进程池，否则直接分类"""
+        lines = self.pending_lines
+        if classify_pool:
+            count = len(lines) if final else len(lines) - len(lines) % CLASSIFY_CHUNK
+            self.jobs.extend(classify_pool.apply_async(classify_chunk, (lines[i:i + CLASSIFY_CHUNK],))
+                             for i in range(0, count, CLASSIFY_CHUNK))
+            self.pending_lines = lines[count:]
+        else:
+            prime_channel_names(lines)
+            for line in lines:
+                self.entries.extend(classify_source_line(line))
+            self.pending_lines = []
+
+    def _settle(self, body_hash):
+        """响应体与上次相同时复用缓存的分类结果（丢弃已分类的部分），否则分类剩余的行并更新缓存"""
+        if self.cached and body_hash and self.cached[0] == body_hash:
+            print("源内容未变，复用缓存的分类结果")
+            self.entries = self.cached[1]
+            self.jobs = []
+            classify_cache.hit(self.url)
+            line_index.touch(map(line_key, self.pending_lines))  # 已分类的行在分类时已标记
+        else:
+            self.body_hash = body_hash
+            self._classify_pending(final=True)
+            if not classify_pool:
+                self._store()
+        self.pending_lines = []
+        return self.entries
+
+    def _store(self):
+        if self.body_hash and CLASSIFY_CACHE:
+            classify_cache.store(self.url, self.body_hash, self.entries)
+
+    def wait(self):
+        """多进程分类时按块顺序取回分类结果（追加到已返回的entries中），合并新分类的行，再写分类缓存"""
+        if not self.jobs:
+            return
+        for job in self.jobs:
+            rows, added, hits = job.get()
+            self.entries.extend((candidates, Channel(*channel), display) for candidates, channel, display in rows)
+            line_index.merge(added, hits)
+        self.jobs = []
+        self._store()
+
+    def finish(self, result):
+        """下载结束（result为Response或异常对象，分类线程已处理完本源的数据块）：返回本源的分类结果，失败返回None"""
+        try:
+            if isinstance(result, Exception):
+                raise result
+            if self.error is not None:
+                raise self.error
+            if result.status == 304:
+                lines = http_cache.get_lines(self.url)
+                if lines is not None:
+                    print("源未修改(304)，使用缓存的解析结果")
+                    self._add_lines(lines)
+                    return self._settle(http_cache.get_body_hash(self.url))
+            result.raise_for_status()
+            if not STREAM_PARSE:
+                self._feed(result.body)
+                if self.error is not None:
+                    raise self.error
+            with stage_timer.stage('parse'):
+                lines = self.parser.close()
+            self._add_lines(lines)
+            if self.parser.encoding != 'utf-8':
+                print(f"编码: {self.parser.encoding}")
+            self.cache_writer.commit(result, self.parser.encoding)
+            return self._settle(self.cache_writer.body_hash.hexdigest())
+        except Exception as e:
+            if self.cache_writer:
+                self.cache_writer.abort()
+            reason = "下载超时" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(f"处理URL时发生错误：{reason}")
+            return self.fallback(reason)
+
+    def fallback(self, reason):
+        """下载失败或超时：丢弃本次已解析的部分，回退到该源最近一次成功的缓存结果"""
+        cached = http_cache.get_stale_lines(self.url)
+        if cached is None:
+            return None
+        lines, stored_at = cached
+        self.entries = []
+        self.line_count = 0
+        self.cache_writer = None
+        self.deferring = self.cached is not None
+        self.pending_lines = []
+        self.jobs = []
+        self._add_lines(lines)
+        self._settle(http_cache.get_body_hash(self.url))
+        stored_str = datetime.fromtimestamp(stored_at).strftime("%Y%m%d_%H_%M_%S") if stored_at else "未知"
+        print(f"使用旧缓存（保存于 {stored_str}）")
+        stale_sources.append((self.url, reason, stored_str))
+        return self.entries
+
+def process_url(url, entries, source=None):
+    """合并单个URL源的分类结果（entries为None表示下载失败，source为订阅源序号）"""
+    other_lines.append("◆◆◆　" + url)  # 在other中标记处理的URL
+    if entries is None:
+        return
+
+    for entry in entries:
+        add_channel_entry(entry, source)
+
+    other_lines.append('\n')  # URL处理完成分隔符
+
+def merge_sources(source_entries):
+    """
+    按订阅源顺序合并各源的分类结果 [(URL, 分类结果或None)]
+    行数较多且安装了pandas时用列式频道表一次完成黑名单过滤和按URL去重，否则逐行合并
+    """
+    rows = sum(len(entries) for _, entries in source_entries if entries)
+    if use_columnar(rows) and merge_sources_columnar(source_entries):
+        return
+    for source_index, (url, entries) in enumerate(source_entries):
+        process_url(url, entries, source_index)
+
+def merge_sources_columnar(source_entries):
+    """列式合并：放入结果与逐行合并相同，这里只按结果填写频道记录、追加到分类列表；无法向量化时返回False"""
+    all_entries = [entry for _, entries in source_entries if entries for entry in entries]
+    result = place_entries(all_entries, combined_blacklist)
+    if result is None:
+        return False
+    placements, duplicates = result
+    position = 0
+    for source_index, (url, entries) in enumerate(source_entries):
+        other_lines.append("◆◆◆　" + url)  # 在other中标记处理的URL
+        if entries is None:
+            continue
+        for (candidates, channel, display), category in zip(entries, placements[position:position + len(entries)]):
+            if category is None:
+                continue
+            if category == 'other':
+                dedup = other_dedup
+            else:
+                dedup = category_dedup[category]
+                channel.name, channel.url = display
+            channel.category, channel.source = category, source_index
+            dedup.urls.add(channel.url)
+            dedup.lines.append(channel)
+        position += len(entries)
+        other_lines.append('\n')  # URL处理完成分隔符
+    for category, count in duplicates.items():
+        (other_dedup if category == 'other' else category_dedup[category]).duplicates += count
+    return True
 
 # ======= 数据校正和排序 =======
 
@@ -462,33 +663,47 @@ def load_corrections_name(filename):
     return corrections
 
 def correct_name_data(corrections, data):
-    """校正频道名称数据"""
+    """
+    校正频道名称数据并按名称和URL去重，保留首次出现的顺序
+    （data为频道记录列表，其中的源标记等文本行跳过；行数较多时用列式频道表处理）
+    """
+    channels = [channel for channel in data if isinstance(channel, Channel)]
+    if use_columnar(len(channels)):
+        return correct_channels(channels, corrections)
     corrected_data = []
-    for line in data:
-        line = line.strip()
-        if ',' not in line:
-            continue  # 行格式错误：跳过
-        name, url = line.split(',', 1)
+    for channel in channels:
         # 如果名称需要校正且不等于正确名称
-        if name in corrections and name != corrections[name]:
-            name = corrections[name]
-        corrected_data.append(f"{name},{url}")
-    return corrected_data
+        name = corrections.get(channel.name)
+        if name is not None and name != channel.name:
+            channel = channel.replace(name=name)
+        corrected_data.append(channel)
+    return list(dict.fromkeys(corrected_data))
 
 def sort_data(order, data):
-    """按照指定顺序排序数据"""
+    """按照指定顺序排序频道记录（稳定排序，同名频道保持原顺序）"""
+    if use_columnar(len(data)):
+        return sort_channels(order, data)
     # 创建顺序字典
     order_dict = {name: i for i, name in enumerate(order)}
     
     # 定义排序键函数
-    def sort_key(line):
-        name = line.split(',')[0]
-        return order_dict.get(name, len(order))  # 不在字典中的排在最后
+    def sort_key(channel):
+        return order_dict.get(channel.name, len(order))  # 不在字典中的排在最后
     
     # 按照顺序对数据进行排序
     sorted_data = sorted(data, key=sort_key)
     return sorted_data
 
+def render_layout(layout, sections):
+    """按版式拼出输出内容：[(分组名, [分类名, ...])] -> 分组标记行 + 各分类内容 + 空行"""
+    lines = []
+    for group_name, categories in layout:
+        lines.append(f"{group_name},#genre#")
+        for category in categories:
+            lines.extend(sections[category])
+        lines.append('\n')
+    return lines
+
 # ======= 体育赛事专用函数 =======
 
 def normalize_date_to_md(text):
@@ -519,7 +734,8 @@ def filter_lines(lines, exclude_keywords):
     :param exclude_keywords: 需要剔除的关键词列表
     :return: 过滤后的新列表
     """
-    return [line for line in lines if not any(keyword in line for keyword in exclude_keywords)]
+    matcher = AhoCorasick(exclude_keywords)
+    return [line for line in lines if not matcher.contains_any(line)]
 
 def generate_playlist_html(data_list, output_file='playlist.html'):
     """生成体育赛事HTML页面"""
@@ -607,7 +823,7 @@ def generate_playlist_html(data_list, output_file='playlist.html'):
     </html>
     '''
 
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with output_publisher.open(output_file) as f:
         f.write(html_head + html_body + html_tail)
     print(f"✅ 网页已生成：{output_file}")
 
@@ -617,8 +833,8 @@ def custom_tyss_sort(lines):
     others = []
 
     for line in lines:
-        # 拆分出名称部分用于判断是否以数字开头
-        name_part = line.split(',')[0].strip()
+        # 判断名称部分是否以数字开头（名称不含逗号，去掉开头空白后看首字符即可）
+        name_part = line.lstrip()
         if name_part and name_part[0].isdigit():
             digit_prefix.append(line)
         else:
@@ -643,43 +859,30 @@ def get_random_url(file_path):
 
 # ======= M3U文件生成 =======
 
-def get_logo_by_channel_name(channel_name):
-    """根据频道名称获取logo URL"""
-    for line in channels_logos:
-        if not line.strip():
-            continue
-        name, url = line.split(',')
-        if name == channel_name:
-            return url
-    return None
+def load_logo_index(file_path):
+    """读入logo库，建立 频道名 -> logo URL 的索引（同名取第一个，与原先逐行查找的结果一致）"""
+    logos = {}
+    for line in read_txt_to_array(file_path):
+        parts = line.split(',')
+        if len(parts) == 2:
+            logos.setdefault(parts[0], parts[1])
+    return logos
 
-def make_m3u(txt_file, m3u_file):
-    """将TXT文件转换为M3U格式"""
+def make_m3u(lines, m3u_file):
+    """
+    将分类后的内容（频道记录、分组标记和文本行）直接生成M3U格式，不再读回刚写出的TXT文件
+    logo按频道名查索引，输出经缓冲写入
+    """
     try:
-        output_text = '#EXTM3U x-tvg-url="https://live.fanmingming.cn/e.xml"\n'
-
-        with open(txt_file, "r", encoding='utf-8') as file:
-            input_text = file.read()
-
-        lines = input_text.strip().split("\n")
-        group_name = ""
-        for line in lines:
-            parts = line.split(",")
-            if len(parts) == 2 and "#genre#" in line:
-                group_name = parts[0]  # 更新分组名称
-            elif len(parts) == 2:
-                channel_name = parts[0]
-                channel_url = parts[1]
-                logo_url = get_logo_by_channel_name(channel_name)
+        with output_publisher.open(m3u_file, buffering=M3U_WRITE_BUFFER) as file:
+            file.write('#EXTM3U x-tvg-url="https://live.fanmingming.cn/e.xml"\n')
+            for group_name, channel_name, channel_url in playlist_entries(lines):
+                logo_url = channel_logos.get(channel_name)
                 if logo_url is None:  # 未找到logo
-                    output_text += f"#EXTINF:-1 group-title=\"{group_name}\",{channel_name}\n"
-                    output_text += f"{channel_url}\n"
+                    file.write(f"#EXTINF:-1 group-title=\"{group_name}\",{channel_name}\n")
                 else:
-                    output_text += f"#EXTINF:-1  tvg-name=\"{channel_name}\" tvg-logo=\"{logo_url}\"  group-title=\"{group_name}\",{channel_name}\n"
-                    output_text += f"{channel_url}\n"
-
-        with open(f"{m3u_file}", "w", encoding='utf-8') as file:
-            file.write(output_text)
+                    file.write(f"#EXTINF:-1  tvg-name=\"{channel_name}\" tvg-logo=\"{logo_url}\"  group-title=\"{group_name}\",{channel_name}\n")
+                file.write(f"{channel_url}\n")
 
         print(f"M3U文件 '{m3u_file}' 生成成功。")
     except Exception as e:
@@ -758,12 +961,82 @@ tyss_dictionary = read_txt_to_array('scripts/livesource/主频道/体育赛事.t
 mgss_dictionary = read_txt_to_array('scripts/livesource/主频道/咪咕赛事.txt')
 zhibozhongguo_dictionary = read_txt_to_array('scripts/livesource/主频道/直播中国.txt')
 
+# 分类规则：顺序即分发优先级 (分类名, 分类字典, 是否按子串匹配)
+category_rules = [
+    ('yangshi', yangshi_dictionary, True), ('weishi', weishi_dictionary, False),
+    # 地方台
+    ('beijing', beijing_dictionary, False), ('shanghai', shanghai_dictionary, False),
+    ('tianjin', tianjin_dictionary, False), ('chongqing', chongqing_dictionary, False),
+    ('guangdong', guangdong_dictionary, False), ('jiangsu', jiangsu_dictionary, False),
+    ('zhejiang', zhejiang_dictionary, False), ('shandong', shandong_dictionary, False),
+    ('henan', henan_dictionary, False), ('sichuan', sichuan_dictionary, False),
+    ('hebei', hebei_dictionary, False), ('hunan', hunan_dictionary, False),
+    ('hubei', hubei_dictionary, False), ('anhui', anhui_dictionary, False),
+    ('fujian', fujian_dictionary, False), ('shanxi1', shanxi1_dictionary, False),
+    ('liaoning', liaoning_dictionary, False), ('jiangxi', jiangxi_dictionary, False),
+    ('heilongjiang', heilongjiang_dictionary, False), ('jilin', jilin_dictionary, False),
+    ('shanxi2', shanxi2_dictionary, False), ('guangxi', guangxi_dictionary, False),
+    ('yunnan', yunnan_dictionary, False), ('guizhou', guizhou_dictionary, False),
+    ('gansu', gansu_dictionary, False), ('neimenggu', neimenggu_dictionary, False),
+    ('xinjiang', xinjiang_dictionary, False), ('hainan', hainan_dictionary, False),
+    ('ningxia', ningxia_dictionary, False), ('qinghai', qinghai_dictionary, False),
+    ('xizang', xizang_dictionary, False),
+    # 主频道
+    ('news', news_dictionary, False), ('shuzi', shuzi_dictionary, False),
+    ('dianying', dianying_dictionary, False), ('jieshuo', jieshuo_dictionary, False),
+    ('zongyi', zongyi_dictionary, False), ('huya', huya_dictionary, False),
+    ('douyu', douyu_dictionary, False), ('xianggang', xianggang_dictionary, False),
+    ('aomen', aomen_dictionary, False), ('china', china_dictionary, False),
+    ('guoji', guoji_dictionary, False), ('gangaotai', gangaotai_dictionary, False),
+    ('dianshiju', dianshiju_dictionary, False), ('radio', radio_dictionary, False),
+    ('donghuapian', donghuapian_dictionary, False), ('jilupian', jilupian_dictionary, False),
+    ('tiyu', tiyu_dictionary, False), ('youxi', youxi_dictionary, False),
+    ('xiqu', xiqu_dictionary, False), ('yinyue', yinyue_dictionary, False),
+    ('chunwan', chunwan_dictionary, False),
+    ('tyss', tyss_dictionary, True),  # 体育赛事（2025新增）
+    ('mgss', mgss_dictionary, True),  # 咪咕赛事（2025新增）
+    ('zhibozhongguo', zhibozhongguo_dictionary, False),
+]
+
+# 分类名 -> 分类存储列表（附带URL去重集合）
+category_lines = {category: globals()[f"{category}_lines"] for category, _, _ in category_rules}
+category_dedup = {category: UrlDedupLines(lines) for category, lines in category_lines.items()}
+other_dedup = UrlDedupLines(other_lines)  # 其他频道（按URL去重）
+
+# 频道名 -> 候选分类索引（启动时构建一次）
+category_index = CategoryIndex(category_rules)
+
 # 2. 加载名称校正
 corrections_name = load_corrections_name('scripts/livesource/corrections_name.txt')
 
+# 订阅源HTTP缓存（ETag/Last-Modified条件请求）
+http_cache = HttpCache('scripts/livesource/cache/http')
+
+# 名称规范化依赖的代码（清理记号、process_part在本脚本中）：修改后名称缓存失效
+name_version = files_version([__file__] + [f'scripts/livesource/{module}.py' for module in ('token_stripper', 't2s_converter')])
+
+# 订阅源分类结果缓存：字典、名称校正文件、本脚本或分类依赖的模块（解析、名称规范化、分类索引）变化时全部失效
+classify_modules = ('text_decoder', 'line_parser', 'token_stripper', 't2s_converter', 'category_index', 'ac_matcher', 'channel')
+classify_version = files_version(
+    glob.glob('scripts/livesource/主频道/*.txt') + glob.glob('scripts/livesource/地方台/*.txt') +
+    ['scripts/livesource/corrections_name.txt', __file__] +
+    [f'scripts/livesource/{module}.py' for module in classify_modules])
+classify_cache = ClassifyCache('scripts/livesource/cache/classified', classify_version)
+
+# 行分类索引：版本与分类结果缓存相同，只分类没见过的行
+line_index = LineIndex(classify_version)
+line_index_file = 'scripts/livesource/cache/lines.json'
+if CLASSIFY_CACHE:
+    line_index.load(line_index_file)
+
+# 频道名规范化缓存预热（与分类字典无关，修改字典时不失效）
+name_cache_file = 'scripts/livesource/cache/names.json'
+name_cache.load(name_cache_file, name_version)
+
 # 3. 处理URL源
 print("开始处理URL源...")
 urls = read_txt_to_array('scripts/livesource/urls-daily.txt')
+source_urls = []
 for url in urls:
     if url.startswith("http"):
         # 处理日期变量
@@ -773,9 +1046,44 @@ for url in urls:
         if "{MMdd-1}" in url:  # 特别处理113格式（前一天）
             yesterday_date_str = (datetime.now() - timedelta(days=1)).strftime("%m%d")
             url = url.replace("{MMdd-1}", yesterday_date_str)
-            
-        print(f"处理URL: {url}")
-        process_url(url)
+        source_urls.append(url)
+
+# 并发下载所有源（边下载边解析分类），再按原始顺序合并，保证输出确定
+print(f"并发下载: {len(source_urls)} 个源, 全局并发 {FETCH_WORKERS}, 单主机并发 {FETCH_PER_HOST}, 流式解析 {STREAM_PARSE}, 分类进程 {CLASSIFY_WORKERS}")
+print(f"时间预算: 单源默认 {run_scheduler.default_budget:g} 秒, 运行截止剩余 {run_scheduler.remaining():.0f} 秒")
+classify_pool = start_classify_pool(CLASSIFY_WORKERS)  # 在下载线程启动前fork
+classify_thread = ThreadPoolExecutor(1, thread_name_prefix='classify')  # 流式解析分类线程（单线程，各源数据块按到达顺序处理）
+classify_backlog = asyncio.Semaphore(CLASSIFY_BACKLOG)  # 等待解析分类的数据块数上限
+source_streams = [SourceStream(url) for url in source_urls]
+stage_timer.begin('fetch')
+source_results = fetch_all(source_urls, headers=http_cache.conditional_headers, timeout=run_scheduler.timeout_for,
+                           on_response=[stream.on_response for stream in source_streams])
+classify_thread.shutdown()  # 等待下载期间排队的数据块处理完
+stage_timer.begin(None)
+source_stats = []  # (URL, 状态, 传输字节数, 解压后字节数)
+stale_sources = []  # (URL, 失败原因, 旧缓存保存时间)
+source_entries = []  # (URL, 分类结果)，全部下载完成后按源顺序合并
+for stream, result in zip(source_streams, source_results):
+    print(f"处理URL: {stream.url}")
+    entries = stream.finish(result)
+    if entries is not None:
+        print(f"行数: {stream.line_count}")
+    source_entries.append((stream.url, entries))
+    if not isinstance(result, Exception):
+        source_stats.append((stream.url, result.status, result.raw_bytes, result.body_bytes))
+if classify_pool:
+    with stage_timer.stage('classify'):
+        for stream in source_streams:
+            stream.wait()
+    classify_pool.close()
+    classify_pool.join()
+with stage_timer.stage('merge'):
+    merge_sources(source_entries)
+print(f"HTTP缓存: 304命中 {http_cache.hits} 个, 重新下载 {http_cache.misses} 个, 使用旧缓存 {http_cache.stale} 个, 清理过期 {http_cache.prune()} 个")
+print(f"分类缓存: 复用 {classify_cache.hits} 个, 重新分类 {classify_cache.misses} 个, 清理过期 {classify_cache.prune()} 个")
+if CLASSIFY_CACHE:
+    line_index.save(line_index_file)
+print(f"行分类索引: {line_index.stats()}")
 
 # 4. 处理白名单
 print(f"ADD whitelist_auto.txt")
@@ -789,19 +1097,24 @@ for whitelist_line in whitelist_auto_lines:
             print(f"response_time转换失败: {whitelist_line}")
             response_time = 60000  # 单位毫秒，转换失败给个60秒
         if response_time < 2000:  # 2s以内的高响应源
-            process_channel_line(",".join(whitelist_parts[1:]))
+            process_channel_line(",".join(whitelist_parts[1:]), response_time)
+
+# 保存频道名规范化缓存，供下次运行预热
+name_cache.save(name_cache_file, name_version)
 
 # ======= 体育赛事数据处理 =======
 
 # 5. 处理体育赛事数据
 # 将日期统一格式化为MM-DD格式
-normalized_tyss_lines = [normalize_date_to_md(s) for s in tyss_lines]
+normalized_tyss_lines = [normalize_date_to_md(str(channel)) for channel in tyss_lines]
 
 # 6. 处理AKTV源
 aktv_lines = []  # AKTV
 aktv_url = "https://aktv.space/live.m3u"  # AKTV
 
-aktv_text = get_http_response(aktv_url)
+# 超过运行截止时间时不再请求，直接使用本地备份
+aktv_timeout = run_scheduler.timeout_for(aktv_url, default=8)
+aktv_text = get_http_response(aktv_url, timeout=aktv_timeout) if aktv_timeout > 0 else None
 if aktv_text:
     print("AKTV成功获取内容")
     aktv_text = convert_m3u_to_txt(aktv_text)
@@ -845,244 +1158,140 @@ about = "👨潇然," + get_random_url('scripts/livesource/手工区/今日推
 # 9. 增加手工区
 print(f"处理手工区...")
 # 使用您的手工区路径
-hubei_lines = hubei_lines + read_txt_to_array('scripts/livesource/手工区/湖北频道.txt')
+hubei_lines.extend(read_channels('scripts/livesource/手工区/湖北频道.txt', 'hubei'))
 
 # 10. 定义输出内容
-# ======= 完整版内容定义 =======
-# 完整版内容 📡 包含所有频道分类
-
-all_lines = ["🌐央视频道,#genre#"] + sort_data(["CCTV1", "CCTV2", "CCTV3", "CCTV4", "CCTV5", "CCTV6", "CCTV7", "CCTV8", "CCTV9", "CCTV10", "CCTV11", "CCTV12", "CCTV13", "CCTV14", "CCTV15", "CCTV16", "CCTV17"], set(correct_name_data(corrections_name, yangshi_lines))) + ['\n'] + \
-    ["📡卫视频道,#genre#"] + sort_data(weishi_dictionary, set(correct_name_data(corrections_name, weishi_lines))) + ['\n'] + \
-    ["🏠北京频道,#genre#"] + sort_data(beijing_dictionary,set(correct_name_data(corrections_name,beijing_lines))) + ['\n'] + \
-    ["🏙️上海频道,#genre#"] + sort_data(shanghai_dictionary,set(correct_name_data(corrections_name,shanghai_lines))) + ['\n'] + \
-    ["🎡天津频道,#genre#"] + sort_data(tianjin_dictionary,set(correct_name_data(corrections_name,tianjin_lines))) + ['\n'] + \
-    ["🏞️重庆频道,#genre#"] + sort_data(chongqing_dictionary,set(correct_name_data(corrections_name,chongqing_lines))) + ['\n'] + \
-    ["🐅广东频道,#genre#"] + sort_data(guangdong_dictionary,set(correct_name_data(corrections_name,guangdong_lines))) + ['\n'] + \
-    ["🎐江苏频道,#genre#"] + sort_data(jiangsu_dictionary,set(correct_name_data(corrections_name,jiangsu_lines))) + ['\n'] + \
-    ["🌊浙江频道,#genre#"] + sort_data(zhejiang_dictionary,set(correct_name_data(corrections_name,zhejiang_lines))) + ['\n'] + \
-    ["⛰️山东频道,#genre#"] + sort_data(shandong_dictionary,set(correct_name_data(corrections_name,shandong_lines))) + ['\n'] + \
-    ["🌾河南频道,#genre#"] + sort_data(henan_dictionary,set(correct_name_data(corrections_name,henan_lines))) + ['\n'] + \
-    ["🐼四川频道,#genre#"] + sort_data(sichuan_dictionary,set(correct_name_data(corrections_name,sichuan_lines))) + ['\n'] + \
-    ["🌉河北频道,#genre#"] + sort_data(hebei_dictionary,set(correct_name_data(corrections_name,hebei_lines))) + ['\n'] + \
-    ["🌶️湖南频道,#genre#"] + sort_data(hunan_dictionary,set(correct_name_data(corrections_name,hunan_lines))) + ['\n'] + \
-    ["🏯湖北频道,#genre#"] + sort_data(hubei_dictionary,set(correct_name_data(corrections_name,hubei_lines))) + ['\n'] + \
-    ["🎨安徽频道,#genre#"] + sort_data(anhui_dictionary,set(correct_name_data(corrections_name,anhui_lines))) + ['\n'] + \
-    ["🍵福建频道,#genre#"] + sort_data(fujian_dictionary,set(correct_name_data(corrections_name,fujian_lines))) + ['\n'] + \
-    ["🗿陕西频道,#genre#"] + sort_data(shanxi1_dictionary,set(correct_name_data(corrections_name,shanxi1_lines))) + ['\n'] + \
-    ["🐯辽宁频道,#genre#"] + sort_data(liaoning_dictionary, set(correct_name_data(corrections_name, liaoning_lines))) + ['\n'] + \
-    ["⛩️江西频道,#genre#"] + sort_data(jiangxi_dictionary, set(correct_name_data(corrections_name, jiangxi_lines))) + ['\n'] + \
-    ["❄️黑龙江台,#genre#"] + sort_data(heilongjiang_dictionary,set(correct_name_data(corrections_name,heilongjiang_lines))) + ['\n'] + \
-    ["🎎吉林频道,#genre#"] + sort_data(jilin_dictionary,set(correct_name_data(corrections_name,jilin_lines))) + ['\n'] + \
-    ["🏮山西频道,#genre#"] + sort_data(shanxi2_dictionary,set(correct_name_data(corrections_name,shanxi2_lines))) + ['\n'] + \
-    ["🐘广西频道,#genre#"] + sort_data(guangxi_dictionary,set(correct_name_data(corrections_name,guangxi_lines))) + ['\n'] + \
-    ["☁️云南频道,#genre#"] + sort_data(yunnan_dictionary,set(correct_name_data(corrections_name,yunnan_lines))) + ['\n'] + \
-    ["🍶贵州频道,#genre#"] + sort_data(guizhou_dictionary,set(correct_name_data(corrections_name,guizhou_lines))) + ['\n'] + \
-    ["🐫甘肃频道,#genre#"] + sort_data(gansu_dictionary,set(correct_name_data(corrections_name,gansu_lines))) + ['\n'] + \
-    ["🐎内蒙古台,#genre#"] + sort_data(neimenggu_dictionary,set(correct_name_data(corrections_name,neimenggu_lines))) + ['\n'] + \
-    ["🍇新疆频道,#genre#"] + sort_data(xinjiang_dictionary,set(correct_name_data(corrections_name,xinjiang_lines))) + ['\n'] + \
-    ["🌴海南频道,#genre#"] + sort_data(hainan_dictionary,set(correct_name_data(corrections_name,hainan_lines))) + ['\n'] + \
-    ["🏜️宁夏频道,#genre#"] + sort_data(ningxia_dictionary,set(correct_name_data(corrections_name,ningxia_lines))) + ['\n'] + \
-    ["🏔️青海频道,#genre#"] + sort_data(qinghai_dictionary,set(correct_name_data(corrections_name,qinghai_lines))) + ['\n'] + \
-    ["⛰️西藏频道,#genre#"] + sort_data(xizang_dictionary,set(correct_name_data(corrections_name,xizang_lines))) + ['\n'] + \
-    ["📰新闻频道,#genre#"] + sort_data(news_dictionary,set(correct_name_data(corrections_name,news_lines))) + ['\n'] + \
-    ["🔢数字频道,#genre#"] + sort_data(shuzi_dictionary,set(correct_name_data(corrections_name,shuzi_lines))) + ['\n'] + \
-    ["🎬电影频道,#genre#"] + sort_data(dianying_dictionary,set(correct_name_data(corrections_name,dianying_lines))) + ['\n'] + \
-    ["🎙️解说频道,#genre#"] + sort_data(jieshuo_dictionary,set(correct_name_data(corrections_name,jieshuo_lines))) + ['\n'] + \
-    ["🎭综艺频道,#genre#"] + sort_data(zongyi_dictionary,set(correct_name_data(corrections_name,zongyi_lines))) + ['\n'] + \
-    ["🐯虎牙直播,#genre#"] + sort_data(huya_dictionary,set(correct_name_data(corrections_name,huya_lines))) + ['\n'] + \
-    ["🐬斗鱼直播,#genre#"] + sort_data(douyu_dictionary,set(correct_name_data(corrections_name,douyu_lines))) + ['\n'] + \
-    ["🇭🇰香港频道,#genre#"] + sort_data(xianggang_dictionary,set(correct_name_data(corrections_name,xianggang_lines))) + ['\n'] + \
-    ["🇲🇴澳门频道,#genre#"] + sort_data(aomen_dictionary,set(correct_name_data(corrections_name,aomen_lines))) + ['\n'] + \
-    ["🇨🇳中国频道,#genre#"] + sort_data(china_dictionary,set(correct_name_data(corrections_name,china_lines))) + ['\n'] + \
-    ["🌍国际频道,#genre#"] + sort_data(guoji_dictionary,set(correct_name_data(corrections_name,guoji_lines))) + ['\n'] + \
-    ["🇨🇳港·澳·台,#genre#"] + sort_data(gangaotai_dictionary,set(correct_name_data(corrections_name,gangaotai_lines))) + ['\n'] + \
-    ["📺电·视·剧,#genre#"] + sort_data(dianshiju_dictionary,set(correct_name_data(corrections_name,dianshiju_lines))) + ['\n'] + \
-    ["📻收·音·机,#genre#"] + sort_data(radio_dictionary,set(correct_name_data(corrections_name,radio_lines))) + ['\n'] + \
-    ["🐶动·画·片,#genre#"] + sort_data(donghuapian_dictionary,set(correct_name_data(corrections_name,donghuapian_lines))) + ['\n'] + \
-    ["🎞️纪·录·片,#genre#"] + sort_data(jilupian_dictionary,set(correct_name_data(corrections_name,jilupian_lines))) + ['\n'] + \
-    ["🎮游戏频道,#genre#"] + sort_data(youxi_dictionary,set(correct_name_data(corrections_name,youxi_lines))) + ['\n'] + \
-    ["🎭戏曲频道,#genre#"] + sort_data(xiqu_dictionary,set(correct_name_data(corrections_name,xiqu_lines))) + ['\n'] + \
-    ["🎵音乐频道,#genre#"] + sort_data(yinyue_dictionary,set(correct_name_data(corrections_name,yinyue_lines))) + ['\n'] + \
-    ["🎉春晚频道,#genre#"] + sort_data(chunwan_dictionary,set(correct_name_data(corrections_name,chunwan_lines))) + ['\n'] + \
-    ["🏆体育赛事,#genre#"] + normalized_tyss_lines + ['\n'] + \
-    ["⚽体育频道,#genre#"] + sort_data(tiyu_dictionary,set(correct_name_data(corrections_name,tiyu_lines))) + ['\n'] + \
-    ["🏀咪咕赛事,#genre#"] + mgss_lines + ['\n'] + \
-    ["📹直播中国,#genre#"] + sort_data(zhibozhongguo_dictionary,set(correct_name_data(corrections_name,zhibozhongguo_lines))) + ['\n'] + \
-    ["❓其他频道,#genre#"] + sorted(set(correct_name_data(corrections_name,other_lines))) + ['\n'] + \
-    ["🕒更新时间,#genre#"] + [version] + [about] + [daily_mtv] + [daily_mtv1] + [daily_mtv2] + [daily_mtv3] + [daily_mtv4] + read_txt_to_array('scripts/livesource/手工区/about.txt') + ['\n']
-
-# ======= 精简版内容定义 =======
-# 精简版内容 🛰️ 包含核心频道分类
-all_lines_simple = ["🌐央  视,#genre#"] + sort_data(["CCTV1", "CCTV2", "CCTV3", "CCTV4", "CCTV5", "CCTV6", "CCTV7", "CCTV8", "CCTV9", "CCTV10", "CCTV11", "CCTV12", "CCTV13", "CCTV14", "CCTV15", "CCTV16", "CCTV17"], set(correct_name_data(corrections_name, yangshi_lines))) + ['\n'] + \
-    ["📡卫  视,#genre#"] + sort_data(weishi_dictionary, set(correct_name_data(corrections_name, weishi_lines))) + ['\n'] + \
-    ["🏠地方台,#genre#"] + \
-    sort_data(beijing_dictionary,set(correct_name_data(corrections_name,beijing_lines))) + \
-    sort_data(shanghai_dictionary,set(correct_name_data(corrections_name,shanghai_lines))) + \
-    sort_data(tianjin_dictionary,set(correct_name_data(corrections_name,tianjin_lines))) + \
-    sort_data(chongqing_dictionary,set(correct_name_data(corrections_name,chongqing_lines))) + \
-    sort_data(guangdong_dictionary,set(correct_name_data(corrections_name,guangdong_lines))) + \
-    sort_data(jiangsu_dictionary,set(correct_name_data(corrections_name,jiangsu_lines))) + \
-    sort_data(zhejiang_dictionary,set(correct_name_data(corrections_name,zhejiang_lines))) + \
-    sort_data(shandong_dictionary,set(correct_name_data(corrections_name,shandong_lines))) + \
-    sort_data(henan_dictionary,set(correct_name_data(corrections_name,henan_lines))) + \
-    sort_data(sichuan_dictionary,set(correct_name_data(corrections_name,sichuan_lines))) + \
-    sort_data(hebei_dictionary,set(correct_name_data(corrections_name,hebei_lines))) + \
-    sort_data(hunan_dictionary,set(correct_name_data(corrections_name,hunan_lines))) + \
-    sort_data(hubei_dictionary,set(correct_name_data(corrections_name,hubei_lines))) + \
-    sort_data(anhui_dictionary,set(correct_name_data(corrections_name,anhui_lines))) + \
-    sort_data(fujian_dictionary,set(correct_name_data(corrections_name,fujian_lines))) + \
-    sort_data(shanxi1_dictionary,set(correct_name_data(corrections_name,shanxi1_lines))) + \
-    sort_data(liaoning_dictionary,set(correct_name_data(corrections_name,liaoning_lines))) + \
-    sort_data(jiangxi_dictionary,set(correct_name_data(corrections_name,jiangxi_lines))) + \
-    sort_data(heilongjiang_dictionary,set(correct_name_data(corrections_name,heilongjiang_lines))) + \
-    sort_data(jilin_dictionary,set(correct_name_data(corrections_name,jilin_lines))) + \
-    sort_data(shanxi2_dictionary,set(correct_name_data(corrections_name,shanxi2_lines))) + \
-    sort_data(guangxi_dictionary,set(correct_name_data(corrections_name,guangxi_lines))) + \
-    sort_data(yunnan_dictionary,set(correct_name_data(corrections_name,yunnan_lines))) + \
-    sort_data(guizhou_dictionary,set(correct_name_data(corrections_name,guizhou_lines))) + \
-    sort_data(gansu_dictionary,set(correct_name_data(corrections_name,gansu_lines))) + \
-    sort_data(neimenggu_dictionary,set(correct_name_data(corrections_name,neimenggu_lines))) + \
-    sort_data(xinjiang_dictionary,set(correct_name_data(corrections_name,xinjiang_lines))) + \
-    sort_data(hainan_dictionary,set(correct_name_data(corrections_name,hainan_lines))) + \
-    sort_data(ningxia_dictionary,set(correct_name_data(corrections_name,ningxia_lines))) + \
-    sort_data(qinghai_dictionary,set(correct_name_data(corrections_name,qinghai_lines))) + \
-    sort_data(xizang_dictionary,set(correct_name_data(corrections_name,xizang_lines))) + ['\n'] + \
-    ["🕒更新时间,#genre#"] + [version] + [about] + [daily_mtv] + [daily_mtv1] + [daily_mtv2] + [daily_mtv3] + [daily_mtv4] + read_txt_to_array('scripts/livesource/手工区/about.txt') + ['\n']
-            
-# ======= 定制版内容定义 =======
-# 定制版内容 🌐📡🛰️📺🏙️🏠🧧🏮 包含定制频道分类
-
-all_lines_custom = ["🌐央视频道,#genre#"] + sort_data(["CCTV1", "CCTV2", "CCTV3", "CCTV4", "CCTV5", "CCTV6", "CCTV7", "CCTV8", "CCTV9", "CCTV10", "CCTV11", "CCTV12", "CCTV13", "CCTV14", "CCTV15", "CCTV16", "CCTV17"], set(correct_name_data(corrections_name, yangshi_lines))) + ['\n'] + \
-    ["📡卫视频道,#genre#"] + sort_data(weishi_dictionary, set(correct_name_data(corrections_name, weishi_lines))) + ['\n'] + \
-    ["🏠地·方·台,#genre#"] + \
-    sort_data(beijing_dictionary,set(correct_name_data(corrections_name,beijing_lines))) + \
-    sort_data(shanghai_dictionary,set(correct_name_data(corrections_name,shanghai_lines))) + \
-    sort_data(tianjin_dictionary,set(correct_name_data(corrections_name,tianjin_lines))) + \
-    sort_data(chongqing_dictionary,set(correct_name_data(corrections_name,chongqing_lines))) + \
-    sort_data(guangdong_dictionary,set(correct_name_data(corrections_name,guangdong_lines))) + \
-    sort_data(jiangsu_dictionary,set(correct_name_data(corrections_name,jiangsu_lines))) + \
-    sort_data(zhejiang_dictionary,set(correct_name_data(corrections_name,zhejiang_lines))) + \
-    sort_data(shandong_dictionary,set(correct_name_data(corrections_name,shandong_lines))) + \
-    sort_data(henan_dictionary,set(correct_name_data(corrections_name,henan_lines))) + \
-    sort_data(sichuan_dictionary,set(correct_name_data(corrections_name,sichuan_lines))) + \
-    sort_data(hebei_dictionary,set(correct_name_data(corrections_name,hebei_lines))) + \
-    sort_data(hunan_dictionary,set(correct_name_data(corrections_name,hunan_lines))) + \
-    sort_data(hubei_dictionary,set(correct_name_data(corrections_name,hubei_lines))) + \
-    sort_data(anhui_dictionary,set(correct_name_data(corrections_name,anhui_lines))) + \
-    sort_data(fujian_dictionary,set(correct_name_data(corrections_name,fujian_lines))) + \
-    sort_data(shanxi1_dictionary,set(correct_name_data(corrections_name,shanxi1_lines))) + \
-    sort_data(liaoning_dictionary,set(correct_name_data(corrections_name,liaoning_lines))) + \
-    sort_data(jiangxi_dictionary,set(correct_name_data(corrections_name,jiangxi_lines))) + \
-    sort_data(heilongjiang_dictionary,set(correct_name_data(corrections_name,heilongjiang_lines))) + \
-    sort_data(jilin_dictionary,set(correct_name_data(corrections_name,jilin_lines))) + \
-    sort_data(shanxi2_dictionary,set(correct_name_data(corrections_name,shanxi2_lines))) + \
-    sort_data(guangxi_dictionary,set(correct_name_data(corrections_name,guangxi_lines))) + \
-    sort_data(yunnan_dictionary,set(correct_name_data(corrections_name,yunnan_lines))) + \
-    sort_data(guizhou_dictionary,set(correct_name_data(corrections_name,guizhou_lines))) + \
-    sort_data(gansu_dictionary,set(correct_name_data(corrections_name,gansu_lines))) + \
-    sort_data(neimenggu_dictionary,set(correct_name_data(corrections_name,neimenggu_lines))) + \
-    sort_data(xinjiang_dictionary,set(correct_name_data(corrections_name,xinjiang_lines))) + \
-    sort_data(hainan_dictionary,set(correct_name_data(corrections_name,hainan_lines))) + \
-    sort_data(ningxia_dictionary,set(correct_name_data(corrections_name,ningxia_lines))) + \
-    sort_data(qinghai_dictionary,set(correct_name_data(corrections_name,qinghai_lines))) + \
-    sort_data(xizang_dictionary,set(correct_name_data(corrections_name,xizang_lines))) + ['\n'] + \
-    ["📰新闻频道,#genre#"] + sort_data(news_dictionary,set(correct_name_data(corrections_name,news_lines))) + ['\n'] + \
-    ["🔢数字频道,#genre#"] + sort_data(shuzi_dictionary,set(correct_name_data(corrections_name,shuzi_lines))) + ['\n'] + \
-    ["🎬电影频道,#genre#"] + sort_data(dianying_dictionary,set(correct_name_data(corrections_name,dianying_lines))) + ['\n'] + \
-    ["🎙️解说频道,#genre#"] + sort_data(jieshuo_dictionary,set(correct_name_data(corrections_name,jieshuo_lines))) + ['\n'] + \
-    ["🎭综艺频道,#genre#"] + sort_data(zongyi_dictionary,set(correct_name_data(corrections_name,zongyi_lines))) + ['\n'] + \
-    ["🐯虎牙直播,#genre#"] + sort_data(huya_dictionary,set(correct_name_data(corrections_name,huya_lines))) + ['\n'] + \
-    ["🐬斗鱼直播,#genre#"] + sort_data(douyu_dictionary,set(correct_name_data(corrections_name,douyu_lines))) + ['\n'] + \
-    ["🇭🇰香港频道,#genre#"] + sort_data(xianggang_dictionary,set(correct_name_data(corrections_name,xianggang_lines))) + ['\n'] + \
-    ["🇲🇴澳门频道,#genre#"] + sort_data(aomen_dictionary,set(correct_name_data(corrections_name,aomen_lines))) + ['\n'] + \
-    ["🇨🇳中国频道,#genre#"] + sort_data(china_dictionary,set(correct_name_data(corrections_name,china_lines))) + ['\n'] + \
-    ["🌍国际频道,#genre#"] + sort_data(guoji_dictionary,set(correct_name_data(corrections_name,guoji_lines))) + ['\n'] + \
-    ["🇨🇳港·澳·台,#genre#"] + sort_data(gangaotai_dictionary,set(correct_name_data(corrections_name,gangaotai_lines))) + ['\n'] + \
-    ["📺电·视·剧,#genre#"] + sort_data(dianshiju_dictionary,set(correct_name_data(corrections_name,dianshiju_lines))) + ['\n'] + \
-    ["📻收·音·机,#genre#"] + sort_data(radio_dictionary,set(correct_name_data(corrections_name,radio_lines))) + ['\n'] + \
-    ["🐶动·画·片,#genre#"] + sort_data(donghuapian_dictionary,set(correct_name_data(corrections_name,donghuapian_lines))) + ['\n'] + \
-    ["🎞️纪·录·片,#genre#"] + sort_data(jilupian_dictionary,set(correct_name_data(corrections_name,jilupian_lines))) + ['\n'] + \
-    ["🎮游戏频道,#genre#"] + sort_data(youxi_dictionary,set(correct_name_data(corrections_name,youxi_lines))) + ['\n'] + \
-    ["🎭戏曲频道,#genre#"] + sort_data(xiqu_dictionary,set(correct_name_data(corrections_name,xiqu_lines))) + ['\n'] + \
-    ["🎵音乐频道,#genre#"] + sort_data(yinyue_dictionary,set(correct_name_data(corrections_name,yinyue_lines))) + ['\n'] + \
-    ["🎉春晚频道,#genre#"] + sort_data(chunwan_dictionary,set(correct_name_data(corrections_name,chunwan_lines))) + ['\n'] + \
-    ["🏆体育赛事,#genre#"] + normalized_tyss_lines + ['\n'] + \
-    ["⚽体育频道,#genre#"] + sort_data(tiyu_dictionary,set(correct_name_data(corrections_name,tiyu_lines))) + ['\n'] + \
-    ["🏀咪咕赛事,#genre#"] + mgss_lines + ['\n'] + \
-    ["📹直播中国,#genre#"] + sort_data(zhibozhongguo_dictionary,set(correct_name_data(corrections_name,zhibozhongguo_lines))) + ['\n'] + \
-    ["❓其他频道,#genre#"] + sorted(set(correct_name_data(corrections_name,other_lines))) + ['\n'] + \
-    ["🕒更新时间,#genre#"] + [version] + [about] + [daily_mtv] + [daily_mtv1] + [daily_mtv2] + [daily_mtv3] + [daily_mtv4] + read_txt_to_array('scripts/livesource/手工区/about.txt') + ['\n']
-
-# 手工专区类型：读取预设的静态优质源文件，手工维护
-# 格式：read_txt_to_array('手工区/文件名.txt')
-
-# 动态赛事类型：自动获取并处理的实时赛事数据  
-# 格式：normalized_tyss_lines（体育赛事） / mgss_lines（咪咕赛事）
-
-# 自动分类类型：脚本自动分类得到的地方频道数据
-# 格式1：sort_data(排序字典, set(correct_name_data(校正字典, 数据))) - 按指定顺序排序
-# 格式2：sorted(set(correct_name_data(校正字典, 数据))) - 按字母顺序排序
+stage_timer.begin('correct_sort')
+# 分类名 -> 输出内容：每个分类只校正、去重、排序一次，三个版本共用
+yangshi_order = ["CCTV1", "CCTV2", "CCTV3", "CCTV4", "CCTV5", "CCTV6", "CCTV7", "CCTV8", "CCTV9", "CCTV10", "CCTV11", "CCTV12", "CCTV13", "CCTV14", "CCTV15", "CCTV16", "CCTV17"]
+sections = {
+    category: sort_data(yangshi_order if category == 'yangshi' else dictionary,
+                        correct_name_data(corrections_name, category_lines[category]))
+    for category, dictionary, _ in category_rules if category not in ('tyss', 'mgss')
+}
+sections['tyss'] = normalized_tyss_lines  # 体育赛事：已过滤并按日期排序
+sections['mgss'] = mgss_lines  # 咪咕赛事：原样输出
+sections['other'] = sorted(correct_name_data(corrections_name, other_lines), key=str)
+sections['update'] = [version, about, daily_mtv, daily_mtv1, daily_mtv2, daily_mtv3, daily_mtv4] + \
+    read_txt_to_array('scripts/livesource/手工区/about.txt')
+
+# ======= 输出版式 =======
+# 版式为 [(分组名, [分类名, ...])]：按顺序输出 "分组名,#genre#"、各分类的内容（多个分类依次合并在同一分组下）和一个空行
+
+# 地方台分类（完整版每省一个分组，精简版和定制版合并为一个分组）
+local_categories = ['beijing', 'shanghai', 'tianjin', 'chongqing', 'guangdong', 'jiangsu', 'zhejiang', 'shandong',
+                    'henan', 'sichuan', 'hebei', 'hunan', 'hubei', 'anhui', 'fujian', 'shanxi1', 'liaoning', 'jiangxi',
+                    'heilongjiang', 'jilin', 'shanxi2', 'guangxi', 'yunnan', 'guizhou', 'gansu', 'neimenggu',
+                    'xinjiang', 'hainan', 'ningxia', 'qinghai', 'xizang']
+local_sections = [
+    ("🏠北京频道", ['beijing']), ("🏙️上海频道", ['shanghai']), ("🎡天津频道", ['tianjin']), ("🏞️重庆频道", ['chongqing']),
+    ("🐅广东频道", ['guangdong']), ("🎐江苏频道", ['jiangsu']), ("🌊浙江频道", ['zhejiang']), ("⛰️山东频道", ['shandong']),
+    ("🌾河南频道", ['henan']), ("🐼四川频道", ['sichuan']), ("🌉河北频道", ['hebei']), ("🌶️湖南频道", ['hunan']),
+    ("🏯湖北频道", ['hubei']), ("🎨安徽频道", ['anhui']), ("🍵福建频道", ['fujian']), ("🗿陕西频道", ['shanxi1']),
+    ("🐯辽宁频道", ['liaoning']), ("⛩️江西频道", ['jiangxi']), ("❄️黑龙江台", ['heilongjiang']), ("🎎吉林频道", ['jilin']),
+    ("🏮山西频道", ['shanxi2']), ("🐘广西频道", ['guangxi']), ("☁️云南频道", ['yunnan']), ("🍶贵州频道", ['guizhou']),
+    ("🐫甘肃频道", ['gansu']), ("🐎内蒙古台", ['neimenggu']), ("🍇新疆频道", ['xinjiang']), ("🌴海南频道", ['hainan']),
+    ("🏜️宁夏频道", ['ningxia']), ("🏔️青海频道", ['qinghai']), ("⛰️西藏频道", ['xizang']),
+]
 
-# 处理流程说明：
-# - read_txt_to_array(): 从文件读取静态频道列表
-# - 变量名: 使用动态处理的频道数据
-# - sort_data(): 按自定义字典顺序排序
-# - sorted(): 按字母顺序排序  
-# - set(): 数据去重
-# - correct_name_data(): 频道名称标准化校正
+# 主频道分组到更新时间（完整版和定制版相同）
+main_sections = [
+    ("📰新闻频道", ['news']), ("🔢数字频道", ['shuzi']), ("🎬电影频道", ['dianying']), ("🎙️解说频道", ['jieshuo']),
+    ("🎭综艺频道", ['zongyi']), ("🐯虎牙直播", ['huya']), ("🐬斗鱼直播", ['douyu']), ("🇭🇰香港频道", ['xianggang']),
+    ("🇲🇴澳门频道", ['aomen']), ("🇨🇳中国频道", ['china']), ("🌍国际频道", ['guoji']), ("🇨🇳港·澳·台", ['gangaotai']),
+    ("📺电·视·剧", ['dianshiju']), ("📻收·音·机", ['radio']), ("🐶动·画·片", ['donghuapian']), ("🎞️纪·录·片", ['jilupian']),
+    ("🎮游戏频道", ['youxi']), ("🎭戏曲频道", ['xiqu']), ("🎵音乐频道", ['yinyue']), ("🎉春晚频道", ['chunwan']),
+    ("🏆体育赛事", ['tyss']), ("⚽体育频道", ['tiyu']), ("🏀咪咕赛事", ['mgss']), ("📹直播中国", ['zhibozhongguo']),
+    ("❓其他频道", ['other']), ("🕒更新时间", ['update']),
+]
 
-# 示例说明
-# 手工专区
-# ["香港台,#genre#"] + read_txt_to_array('专区/♪香港台.txt') + ['\n'] + \
+# 完整版 📡 包含所有频道分类
+full_layout = [("🌐央视频道", ['yangshi']), ("📡卫视频道", ['weishi'])] + local_sections + main_sections
+
+# 精简版 🛰️ 包含核心频道分类
+lite_layout = [("🌐央  视", ['yangshi']), ("📡卫  视", ['weishi']), ("🏠地方台", local_categories),
+               ("🕒更新时间", ['update'])]
 
-# 动态赛事  
-# ["体育赛事,#genre#"] + normalized_tyss_lines + ['\n'] + \
+# 定制版 🌐📡🛰️📺🏙️🏠🧧🏮 包含定制频道分类
+custom_layout = [("🌐央视频道", ['yangshi']), ("📡卫视频道", ['weishi']), ("🏠地·方·台", local_categories)] + main_sections
 
-# 自动分类（字典排序）
-# ["山东,#genre#"] + sort_data(shandong_dictionary,set(correct_name_data(corrections_name,shandong_lines))) + ['\n'] + \
+all_lines = render_layout(full_layout, sections)
+all_lines_simple = render_layout(lite_layout, sections)
+all_lines_custom = render_layout(custom_layout, sections)
+
+# 分组内容类型：
+# - 自动分类：sort_data(排序字典, correct_name_data(校正字典, 数据)) - 按指定顺序排序
+#             sorted(correct_name_data(校正字典, 数据), key=str) - 按 "名称,URL" 文本的字母顺序排序（其他频道）
+# - 动态赛事：normalized_tyss_lines（体育赛事） / mgss_lines（咪咕赛事）
+# - 手工专区：read_txt_to_array('手工区/文件名.txt')，读取预设的静态优质源文件，手工维护
+
+# 处理流程说明：
+# - correct_name_data(): 频道名称标准化校正，并按名称和URL去重（保留首次出现的顺序，输出稳定）
+# - sort_data(): 按自定义字典顺序排序；sorted(): 按字母顺序排序
+# - 分类列表中的条目为频道记录(Channel)，写文件时才转成 "名称,URL" 文本
+
+# 示例说明
+# 手工专区：先放入sections，再加到版式中
+# sections['xianggangtai'] = read_txt_to_array('专区/♪香港台.txt')
+# ("香港台", ['xianggangtai']),
 
 # 自动分类（字母排序）
-# ["☘️江苏,#genre#"] + sorted(set(correct_name_data(corrections_name,jsu_lines))) + ['\n'] + \
+# sections['jsu'] = sorted(correct_name_data(corrections_name, jsu_lines), key=str)
+# ("☘️江苏", ['jsu']),
 
 # 11. 保存输出文件
+stage_timer.begin('render_txt')
 output_full = "output/full.txt"
 output_lite = "output/lite.txt" 
 output_custom = "output/custom.txt"
 others_file = "output/others.txt"
 
+# 播放列表：覆盖前先读入上次的文件，写完后生成增量
+playlists = [output_full, output_lite, output_custom]
+previous_playlists = {path: read_playlist(path) for path in playlists}
+
 try:
     # 保存完整版
-    with open(output_full, 'w', encoding='utf-8') as f:
+    with output_publisher.open(output_full) as f:
         for line in all_lines:
-            f.write(line + '\n')
+            f.write(f"{line}\n")
     print(f"完整版已保存到文件: {output_full}")
 
     # 保存精简版
-    with open(output_lite, 'w', encoding='utf-8') as f:
+    with output_publisher.open(output_lite) as f:
         for line in all_lines_simple:
-            f.write(line + '\n')
+            f.write(f"{line}\n")
     print(f"精简版已保存到文件: {output_lite}")
 
     # 保存定制版
-    with open(output_custom, 'w', encoding='utf-8') as f:
+    with output_publisher.open(output_custom) as f:
         for line in all_lines_custom:
-            f.write(line + '\n')
+            f.write(f"{line}\n")
     print(f"定制版已保存到文件: {output_custom}")
 
     # 保存其他频道
-    with open(others_file, 'w', encoding='utf-8') as f:
+    with output_publisher.open(others_file) as f:
         for line in other_lines:
-            f.write(line + '\n')
+            f.write(f"{line}\n")
     print(f"其他频道已保存到文件: {others_file}")
 
 except Exception as e:
     print(f"保存文件时发生错误：{e}")
 
+# 生成播放列表增量（相对上次运行新增、删除的频道）
+stage_timer.begin('delta')
+for path in playlists:
+    added_count, removed_count, generation = write_delta(output_publisher, path, previous_playlists[path], formatted_time)
+    print(f"增量 {path}: 第 {generation} 代, 新增 {added_count} 个, 删除 {removed_count} 个")
+
 # 12. 生成M3U文件
-channels_logos = read_txt_to_array('scripts/livesource/logo.txt')  # 读入logo库
-make_m3u(output_full, output_full.replace(".txt", ".m3u"))
-make_m3u(output_lite, output_lite.replace(".txt", ".m3u"))
-make_m3u(output_custom, output_custom.replace(".txt", ".m3u"))
+stage_timer.begin('render_m3u')
+channel_logos = load_logo_index('scripts/livesource/logo.txt')  # 读入logo库
+make_m3u(all_lines, output_full.replace(".txt", ".m3u"))
+make_m3u(all_lines_simple, output_lite.replace(".txt", ".m3u"))
+make_m3u(all_lines_custom, output_custom.replace(".txt", ".m3u"))
+stage_timer.begin(None)
+print(f"输出发布: {output_publisher.stats()}")
 
 # ======= 执行统计和日志 =======
 
@@ -1113,6 +1322,29 @@ print(f"黑名单行数: {combined_blacklist_hj} ")
 print(f"完整源行数: {all_lines_hj} ")
 print(f"其它源行数: {other_lines_hj} ")
 
+print("\n=== 分类URL去重统计 ===")
+for category, dedup in category_dedup.items():
+    if dedup.duplicates:
+        print(f"{category}: 收录 {len(dedup.urls)} 个, 重复 {dedup.duplicates} 次")
+print(f"other: 收录 {len(other_dedup.urls)} 个, 重复 {other_dedup.duplicates} 次")
+
+print("\n=== 频道名规范化缓存 ===")
+print(name_cache.stats())
+print(t2s_converter.stats())
+
+print("\n=== 订阅源传输统计 ===")
+for url, status, raw_bytes, body_bytes in source_stats:
+    ratio = body_bytes / raw_bytes if raw_bytes else 0
+    print(f"{status} {url} - 传输 {raw_bytes} 字节, 解压后 {body_bytes} 字节, 压缩比 {ratio:.1f}x")
+total_raw_bytes = sum(item[2] for item in source_stats)
+total_body_bytes = sum(item[3] for item in source_stats)
+print(f"合计: 传输 {total_raw_bytes} 字节, 解压后 {total_body_bytes} 字节")
+
+print("\n=== 使用旧缓存的订阅源 ===")
+for url, reason, stored_str in stale_sources:
+    print(f"⚠️ {url} - {reason}, 使用 {stored_str} 的缓存")
+print(f"合计: {len(stale_sources)} 个 (运行截止时间 {RUN_DEADLINE:g} 秒, 剩余 {run_scheduler.remaining():.0f} 秒)")
+
 print("\n=== 输出文件统计 ===")
 output_files = [
     'output/full.txt', 'output/lite.txt', 'output/custom.txt', 
@@ -1122,6 +1354,13 @@ output_files = [
 for file_path in output_files:
     if os.path.exists(file_path):
         file_size = os.path.getsize(file_path)
-        print(f"✅ {file_path} - {file_size} 字节")
+        note = " (内容未变化，未改写)" if file_path in output_publisher.unchanged else ""
+        print(f"✅ {file_path} - {file_size} 字节{note}")
+        for fmt, compressed_size in output_publisher.compressed_sizes(file_path):
+            ratio = file_size / compressed_size if compressed_size else 0
+            print(f"   {fmt}: {compressed_size} 字节, 压缩比 {ratio:.1f}x")
     else:
         print(f"❌ {file_path} - 文件未找到")
+
+# 分阶段耗时（设置BENCH_STAGES时写出，供benchmark.py汇总）
+stage_timer.save()
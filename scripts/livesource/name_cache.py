@@ -0,0 +1,80 @@
+"""
+频道名称规范化缓存
+功能：同一个原始频道名（如 CCTV1、湖南卫视）在各订阅源中会出现成千上万次，
+      把 原始名 -> 规范化结果（名称清理、繁转简、显示名处理）缓存起来，只在首次出现时计算。
+      分类一块订阅源行前可批量填充（繁转简一次调用OpenCC完成）。
+      有容量上限（LRU淘汰），可保存到磁盘供下次运行预热，并统计命中、未命中和淘汰次数。
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+NAME_CACHE_SIZE = int(os.environ.get('NAME_CACHE_SIZE', 100000))  # 缓存条目上限
+
+class NameCache:
+    """带容量上限的LRU缓存：以原始名为键调用func计算，值为可JSON序列化的元组"""
+
+    def __init__(self, func, max_size=NAME_CACHE_SIZE):
+        self.func = func
+        self.max_size = max(1, max_size)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loaded = 0     # 从磁盘预热的条目数
+        self.filled = 0     # 批量填充的条目数
+
+    def __call__(self, key):
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        value = self.func(key)
+        entries[key] = value
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def fill(self, keys, func_many):
+        """批量计算尚未缓存的键并放入缓存：去重后一次调用func_many（返回与输入一一对应的值列表）"""
+        entries = self.entries
+        pending = [key for key in dict.fromkeys(keys) if key not in entries]
+        if not pending:
+            return
+        for key, value in zip(pending, func_many(pending)):
+            entries[key] = value
+        self.filled += len(pending)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def load(self, path, version):
+        """从磁盘预热（版本不同时忽略，如清理规则或代码已修改）"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != version:
+            return
+        for key, value in data['entries'][-self.max_size:]:
+            self.entries[key] = tuple(value)
+        self.loaded = len(self.entries)
+
+    def save(self, path, version):
+        """保存到磁盘（按最近使用顺序，下次加载时保留最近使用的条目）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'entries': list(self.entries.items())}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return (f"命中 {self.hits} 次, 未命中 {self.misses} 次, 命中率 {rate:.1f}%, "
+                f"批量填充 {self.filled} 个, 淘汰 {self.evictions} 个, 预热 {self.loaded} 个, 当前 {len(self.entries)} 个")
@@ -0,0 +1,131 @@
+"""
+输出文件发布
+功能：输出文件先写到同目录的临时文件，写完后与现有文件比较内容哈希，
+      内容不同时才原子替换（os.replace），相同时丢弃临时文件、保留原文件（修改时间不变）。
+      读取方在写入过程中拿到的始终是完整的旧文件或新文件，不会读到写了一半的播放列表；
+      未变化的文件不改动，提交步骤的 git add 也不必重新计算它们的哈希。
+      TXT/M3U/HTML输出同时生成预压缩文件（.gz、.br），静态托管时可直接返回压缩版本；
+      只在内容变化（或预压缩文件缺失）时重新压缩。
+"""
+
+import gzip
+import hashlib
+import os
+from contextlib import contextmanager
+
+try:
+    import brotli  # 可选依赖：安装后生成.br预压缩文件
+except ImportError:
+    brotli = None
+
+# 预压缩格式（逗号分隔，留空不生成）和压缩级别
+# 默认gzip 6、brotli 9：压缩率接近最高级别，耗时少得多；需要最小文件时设 GZIP_LEVEL=9、BROTLI_QUALITY=11
+COMPRESS_OUTPUTS = [fmt.strip() for fmt in os.environ.get('COMPRESS_OUTPUTS', 'gz,br').split(',') if fmt.strip()]
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 9))
+COMPRESS_SUFFIXES = ('.txt', '.m3u', '.html')  # 需要预压缩的输出文件类型
+
+def compress_gz(data, level=GZIP_LEVEL):
+    """gzip压缩（mtime固定为0，相同内容得到相同的压缩文件）"""
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def compress_br(data, quality=BROTLI_QUALITY):
+    return brotli.compress(data, quality=quality, mode=brotli.MODE_TEXT)
+
+# 格式 -> 压缩函数（未安装brotli时不生成.br）
+COMPRESSORS = {'gz': compress_gz}
+if brotli is not None:
+    COMPRESSORS['br'] = compress_br
+
+def file_digest(path):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def same_content(path_a, path_b):
+    """两个文件内容是否相同（先比较大小，大小相同再比较哈希）"""
+    try:
+        if os.path.getsize(path_a) != os.path.getsize(path_b):
+            return False
+    except OSError:
+        return False
+    return file_digest(path_a) == file_digest(path_b)
+
+class OutputPublisher:
+    """输出文件发布器：记录本次更新和未变化（跳过写入）的文件"""
+
+    def __init__(self, formats=COMPRESS_OUTPUTS):
+        self.updated = []      # 内容变化、已替换的文件
+        self.unchanged = []    # 内容相同、跳过写入的文件
+        self.formats = [fmt for fmt in formats if fmt in COMPRESSORS]
+        self.compressed = 0    # 本次生成的预压缩文件数
+        missing = [fmt for fmt in formats if fmt not in COMPRESSORS]
+        if missing:
+            print(f"不支持的预压缩格式（br需要安装brotli）: {', '.join(missing)}")
+
+    @contextmanager
+    def open(self, path, buffering=-1):
+        """以文本方式写入输出文件：with publisher.open(path) as f: ...，正常结束时发布，出错时丢弃"""
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', buffering=buffering) as f:
+                yield f
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.publish(tmp_path, path)
+
+    def publish(self, tmp_path, path):
+        """内容与现有文件不同时用临时文件原子替换，相同时删除临时文件；返回是否更新"""
+        if same_content(tmp_path, path):
+            os.remove(tmp_path)
+            self.unchanged.append(path)
+            self.precompress(path, changed=False)
+            return False
+        os.replace(tmp_path, path)
+        self.updated.append(path)
+        self.precompress(path, changed=True)
+        return True
+
+    def precompress(self, path, changed):
+        """
+        生成预压缩文件（path.gz、path.br）：内容未变化时只补生成缺失的文件；
+        内容变化时重新压缩，未启用的格式删除旧的预压缩文件，避免与新内容不一致
+        """
+        if not path.endswith(COMPRESS_SUFFIXES):
+            return
+        data = None
+        for fmt in ('gz', 'br'):
+            compressed_path = f"{path}.{fmt}"
+            if fmt not in self.formats:
+                if changed and os.path.exists(compressed_path):
+                    os.remove(compressed_path)
+                continue
+            if not changed and os.path.exists(compressed_path):
+                continue
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            tmp_path = compressed_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(COMPRESSORS[fmt](data))
+            os.replace(tmp_path, compressed_path)
+            self.compressed += 1
+
+    def compressed_sizes(self, path):
+        """输出文件的预压缩文件大小 [(格式, 字节数)]"""
+        sizes = []
+        for fmt in self.formats:
+            compressed_path = f"{path}.{fmt}"
+            if os.path.exists(compressed_path):
+                sizes.append((fmt, os.path.getsize(compressed_path)))
+        return sizes
+
+    def stats(self):
+        formats = ", ".join(self.formats) or "无"
+        return (f"更新 {len(self.updated)} 个, 内容未变化跳过 {len(self.unchanged)} 个, "
+                f"预压缩 {self.compressed} 个 ({formats})")
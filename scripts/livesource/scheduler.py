@@ -0,0 +1,56 @@
+"""
+运行截止时间调度模块
+功能：为整次运行设定截止时间，为每个订阅源分配时间预算（取两者中较早者），
+      超时的下载由下载引擎取消，调用方回退到该源最近一次成功的缓存副本。
+"""
+
+import os
+import time
+from urllib.parse import urlsplit
+
+# 整体运行截止时间（秒，从调度器创建算起）与单源默认时间预算（秒）
+RUN_DEADLINE = float(os.environ.get('RUN_DEADLINE', 900))
+REQUEST_TIMEOUT = float(os.environ.get('REQUEST_TIMEOUT', 30))
+
+def load_source_budgets(file_path):
+    """读取单源时间预算配置，每行格式：URL或主机名,秒数（#开头为注释）"""
+    budgets = {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or ',' not in line:
+                    continue
+                target, seconds = line.rsplit(',', 1)
+                try:
+                    budgets[target.strip()] = float(seconds)
+                except ValueError:
+                    print(f"时间预算格式错误: {line}")
+    except FileNotFoundError:
+        print(f"File '{file_path}' not found.")
+    return budgets
+
+class DeadlineScheduler:
+    """整体截止时间 + 单源时间预算"""
+
+    def __init__(self, run_deadline=RUN_DEADLINE, default_budget=REQUEST_TIMEOUT, budgets=None):
+        self.deadline = time.monotonic() + run_deadline
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+
+    def remaining(self):
+        """距离整体截止时间的剩余秒数"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def budget_for(self, url, default=None):
+        """源的时间预算：URL精确配置优先，其次主机名配置，最后使用默认值"""
+        if url in self.budgets:
+            return self.budgets[url]
+        host = urlsplit(url).netloc.lower()
+        if host in self.budgets:
+            return self.budgets[host]
+        return self.default_budget if default is None else default
+
+    def timeout_for(self, url, default=None):
+        """本次下载可用的超时秒数（不超过整体剩余时间），为0表示已无时间"""
+        return min(self.budget_for(url, default), self.remaining())
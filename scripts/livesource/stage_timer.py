@@ -0,0 +1,78 @@
+"""
+分阶段计时模块
+功能：设置环境变量 BENCH_STAGES=输出文件 时，累计流水线各阶段（下载、解析、名称清理、分类、
+      合并、校正排序、TXT/M3U生成）的耗时和调用次数，运行结束写入JSON，供benchmark.py汇总。
+      未设置时计时装饰器直接返回原函数，不增加任何开销。
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+BENCH_STAGES = os.environ.get('BENCH_STAGES', '')
+
+class StageTimer:
+    """阶段耗时累加器"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.totals = {}    # 阶段 -> 累计秒数
+        self.calls = {}     # 阶段 -> 调用次数
+        self.current = None
+        self.started = 0.0
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def timed(self, stage):
+        """函数计时装饰器（用于逐行调用的函数，如名称清理、分类匹配）"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def stage(self, stage):
+        """代码块计时"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def begin(self, stage):
+        """结束当前顺序阶段并开始新阶段（stage为None时只结束），用于脚本中连续的大段流程"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.current is not None:
+            self.add(self.current, now - self.started)
+        self.current = stage
+        self.started = now
+
+    def save(self, path=BENCH_STAGES):
+        """写出各阶段耗时"""
+        if not self.enabled:
+            return
+        self.begin(None)
+        stages = {stage: {'seconds': round(seconds, 6), 'calls': self.calls[stage]}
+                  for stage, seconds in self.totals.items()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stages, f, ensure_ascii=False, indent=2)
+
+stage_timer = StageTimer(bool(BENCH_STAGES))
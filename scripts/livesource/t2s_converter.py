@@ -0,0 +1,66 @@
+"""
+繁转简转换服务
+功能：每个进程只初始化一次OpenCC（加载转换词典开销很大，不能每次调用都新建），
+      提供单个转换和批量转换接口；纯ASCII名称和已确认不含繁体字的名称直接返回，不调用OpenCC。
+"""
+
+import opencc
+
+class T2SConverter:
+    """OpenCC转换器封装：延迟初始化 + 快速路径 + 批量转换"""
+
+    def __init__(self, config='t2s'):
+        self.config = config
+        self._converter = None
+        self.plain_names = set()   # 已确认转换前后相同（不含繁体字）的名称
+        self.conversions = 0       # 实际交给OpenCC转换的名称数
+        self.skipped = 0           # 走快速路径的次数
+
+    @property
+    def converter(self):
+        if self._converter is None:
+            self._converter = opencc.OpenCC(self.config)
+        return self._converter
+
+    def _is_plain(self, text):
+        return text.isascii() or text in self.plain_names
+
+    def convert(self, text):
+        """转换单个字符串"""
+        if self._is_plain(text):
+            self.skipped += 1
+            return text
+        self.conversions += 1
+        result = self.converter.convert(text)
+        if result == text:
+            self.plain_names.add(text)
+        return result
+
+    def convert_many(self, texts):
+        """
+        批量转换：去重后把需要转换的名称用换行连接，一次调用OpenCC完成，
+        返回与texts一一对应的结果列表
+        """
+        pending = list(dict.fromkeys(text for text in texts if not self._is_plain(text) and '\n' not in text))
+        results = {}
+        if pending:
+            converted = self.converter.convert('\n'.join(pending)).split('\n')
+            if len(converted) != len(pending):  # 防御：行数对不上时逐个转换
+                converted = [self.converter.convert(text) for text in pending]
+            self.conversions += len(pending)
+            for text, result in zip(pending, converted):
+                results[text] = result
+                if result == text:
+                    self.plain_names.add(text)
+        return [results[text] if text in results else self.convert(text) for text in texts]
+
+    def stats(self):
+        return f"OpenCC转换 {self.conversions} 个, 快速路径跳过 {self.skipped} 次, 已知无繁体 {len(self.plain_names)} 个"
+
+_converters = {}
+
+def get_converter(config='t2s'):
+    """获取进程内共享的转换器（每种配置只初始化一次）"""
+    if config not in _converters:
+        _converters[config] = T2SConverter(config)
+    return _converters[config]
@@ -0,0 +1,115 @@
+"""
+订阅源文本解码模块
+功能：优先按BOM/UTF-8快速解码，失败时只取一小段样本检测编码（chardet可选），
+      支持边下载边增量解码；中途遇到非UTF-8字节时按检测结果切换编码继续解码。
+      检测到的编码由调用方按URL缓存，下次运行时仍先做BOM/UTF-8检查（缓存的编码如gb18030
+      也能解码UTF-8字节，直接使用会得到乱码），只用缓存的编码代替chardet/候选编码检测。
+"""
+
+import codecs
+
+try:
+    import chardet
+except ImportError:  # 未安装时按候选编码依次尝试
+    chardet = None
+
+SAMPLE_SIZE = 16 * 1024  # 编码检测样本大小（字节）
+
+# 未安装chardet或检测失败时依次尝试的编码
+FALLBACK_ENCODINGS = ('gb18030', 'big5')
+
+# chardet结果归一化（GB2312/GBK统一按超集gb18030解码）
+ENCODING_ALIASES = {
+    'ascii': 'utf-8',
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'big5': 'big5hkscs',
+}
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+def _can_decode(sample, encoding):
+    """样本能否按encoding解码（样本末尾可能截断半个字符，按增量方式判断）"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+def detect_encoding(sample, exclude=None, hint=None):
+    """
+    检测样本的编码：BOM > UTF-8 > hint > chardet > 候选编码
+    :param exclude: 已确认不适用的编码（如中途解码失败的编码）
+    :param hint: 上次使用的编码（按URL缓存），能解码样本时代替chardet/候选编码检测
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if exclude != 'utf-8' and _can_decode(sample, 'utf-8'):
+        return 'utf-8'
+    if hint and hint != exclude and _can_decode(sample, hint):
+        return hint
+    if chardet is not None:
+        guess = (chardet.detect(sample).get('encoding') or '').lower()
+        guess = ENCODING_ALIASES.get(guess, guess)
+        if guess and guess != exclude and _can_decode(sample, guess):
+            return guess
+    for encoding in FALLBACK_ENCODINGS:
+        if encoding != exclude and _can_decode(sample, encoding):
+            return encoding
+    return 'utf-8'
+
+class StreamDecoder:
+    """增量解码器：先缓存样本再检测编码，encoding（如按URL缓存的结果）只代替chardet/候选编码检测"""
+
+    def __init__(self, encoding=None):
+        self.hint = encoding
+        self.encoding = None
+        self.buffer = b''
+        self.decoder = None
+        self.errors = 'strict'
+
+    def _start(self, encoding, errors='strict'):
+        self.encoding = encoding
+        self.errors = errors
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors)
+
+    def _decode(self, data, final):
+        pending = self.decoder.getstate()[0]  # 解码器内上一块末尾未完成的字节（出错后部分解码器会清空，先取出）
+        try:
+            return self.decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            if self.errors != 'strict':
+                raise
+            # e.start是相对 pending + data 的位置：出错位置之前的部分按原编码解码，
+            # 从出错位置开始重新检测编码，只解码其后的字节
+            data = pending + data
+            text = data[:e.start].decode(self.encoding, 'replace')
+            data = data[e.start:]
+            encoding = detect_encoding(data[:SAMPLE_SIZE], exclude=self.encoding, hint=self.hint)
+            # 重新检测后仍失败则替换非法字节，保证整个源不会因个别字节丢失
+            self._start(encoding, 'strict' if encoding != self.encoding else 'replace')
+            try:
+                return text + self.decoder.decode(data, final)
+            except UnicodeDecodeError:
+                self._start(encoding, 'replace')
+                return text + self.decoder.decode(data, final)
+
+    def decode(self, data, final=False):
+        """输入字节块，返回可解码的文本"""
+        if self.decoder is None:
+            self.buffer += data
+            if len(self.buffer) < SAMPLE_SIZE and not final:
+                return ''
+            data, self.buffer = self.buffer, b''
+            self._start(detect_encoding(data[:SAMPLE_SIZE], hint=self.hint))
+        return self._decode(data, final)
+
+def decode_bytes(data, encoding=None):
+    """整体解码字节串，返回 (文本, 实际使用的编码)"""
+    decoder = StreamDecoder(encoding)
+    return decoder.decode(data, final=True), decoder.encoding
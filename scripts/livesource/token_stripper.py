@@ -0,0 +1,62 @@
+"""
+频道名称记号清理
+功能：把 removal_list 中需要移除的记号（高清、频道、「IPV6」等）按前缀树合并编译成一个正则，
+      对频道名只做一次从左到右的扫描就能判断是否含有任何记号，不含记号的名称直接返回。
+      含有记号时按列表原顺序逐个替换，结果与原来逐个 str.replace 完全一致
+      （移除一个记号后前后拼接可能形成新记号，如 高频道清 -> 高清；记号重叠时如 频英陆，
+      先移除哪个取决于列表顺序，所以不能简单地一次扫描全部删除）。
+      末尾后缀规则（HD、台）可配置。
+"""
+
+import re
+
+# 末尾后缀规则：(后缀, 最小长度)，按顺序检查，名称以该后缀结尾且长度大于最小长度时移除后缀
+SUFFIX_RULES = (("HD", 0), ("台", 3))
+
+def build_trie_pattern(tokens):
+    """把记号构建成前缀树再转成正则（公共前缀只匹配一次，如 频(?:道|陆|晴|...)）"""
+    trie = {}
+    for token in tokens:
+        node = trie
+        for char in token:
+            node = node.setdefault(char, {})
+        node[''] = {}  # 记号结束标记
+    return _trie_to_regex(trie)
+
+def _trie_to_regex(node):
+    branches = [re.escape(char) + _trie_to_regex(child) for char, child in node.items() if char]
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    group = '(?:' + '|'.join(branches) + ')'
+    return group + '?' if '' in node else group
+
+class TokenStripper:
+    """记号清理器：构建一次，之后对每个频道名调用"""
+
+    def __init__(self, tokens, suffix_rules=SUFFIX_RULES):
+        self.tokens = tuple(token for token in tokens if token)
+        self.suffix_rules = tuple((suffix, min_length) for suffix, min_length in suffix_rules if suffix)
+        self.pattern = re.compile(build_trie_pattern(self.tokens)) if self.tokens else None
+
+    def strip(self, name):
+        if self.pattern is not None and self.pattern.search(name):
+            for token in self.tokens:
+                if token in name:
+                    name = name.replace(token, "")
+        for suffix, min_length in self.suffix_rules:
+            if name.endswith(suffix) and len(name) > min_length:
+                name = name[:-len(suffix)]
+        return name
+
+    __call__ = strip
+
+_strippers = {}
+
+def get_stripper(tokens, suffix_rules=SUFFIX_RULES):
+    """获取共享的清理器（同一组记号和后缀规则只编译一次）"""
+    key = (tuple(tokens), tuple(suffix_rules))
+    if key not in _strippers:
+        _strippers[key] = TokenStripper(*key)
+    return _strippers[key]
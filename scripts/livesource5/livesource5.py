@@ -5,23 +5,29 @@
 版本：1.0
 """
 
-import urllib.request
+import asyncio
 from urllib.parse import urlparse
 import re
 import os
 from datetime import datetime, timedelta, timezone
 import random
-import opencc
 import socket
 import time
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "livesource"))
+from token_stripper import get_stripper
+from fetcher import fetch_url
+from scheduler import REQUEST_TIMEOUT
+from t2s_converter import get_converter
 
 # 创建输出目录
 os.makedirs('output/livesource5', exist_ok=True)
 
 def traditional_to_simplified(text: str) -> str:
-    """繁体中文转简体中文"""
-    converter = opencc.OpenCC('t2s')
-    return converter.convert(text)
+    """繁体中文转简体中文（进程内共享的转换器，只加载一次词典）"""
+    return get_converter('t2s').convert(text)
 
 # 记录开始时间
 timestart = datetime.now()
@@ -185,18 +191,11 @@ removal_list = ["_电信", "电信", "高清", "频道", "（HD）", "-HD", "英
                 "粤陆", "国陆", "肆柒", "频英", "频特", "频国", "频壹", "频贰", "肆贰", "频测", "咪咕", "闽特", "高特", "频高", "频标", "汝阳", 
                 "[HD]", "[BD]", "[SD]", "[VGA]"]
 
-def clean_channel_name(channel_name, removal_list):
-    """清理频道名称中的特定字符"""
-    for item in removal_list:
-        channel_name = channel_name.replace(item, "")
-
-    if channel_name.endswith("HD"):
-        channel_name = channel_name[:-2]
-    
-    if channel_name.endswith("台") and len(channel_name) > 3:
-        channel_name = channel_name[:-1]
+name_stripper = get_stripper(removal_list)  # 模块加载时绑定一次，逐行清理时不再查找
 
-    return channel_name
+def clean_channel_name(channel_name):
+    """清理频道名称中的特定字符（共享的记号清理器，含末尾'HD'和'台'的处理）"""
+    return name_stripper.strip(channel_name)
 
 def normalize_channel_name(channel_name):
     """标准化频道名称用于去重比较"""
@@ -216,7 +215,7 @@ def process_channel_line(line):
     """处理单行频道数据并分类"""
     if "#genre#" not in line and "#EXTINF:" not in line and "," in line and "://" in line:
         channel_name = line.split(',')[0].strip()
-        channel_name = clean_channel_name(channel_name, removal_list)
+        channel_name = clean_channel_name(channel_name)
         channel_name = traditional_to_simplified(channel_name)
         normalized_name = normalize_channel_name(channel_name)
 
@@ -362,32 +361,32 @@ def process_url(url):
     """处理单个URL获取直播源"""
     try:
         other_lines.append("◆◆◆　" + url)
-        
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3')
-
-        with urllib.request.urlopen(req) as response:
-            data = response.read()
-            text = data.decode('utf-8').strip()
-
-            is_m3u = text.startswith("#EXTM3U") or text.startswith("#EXTINF")
-            if get_url_file_extension(url) == ".m3u" or get_url_file_extension(url) == ".m3u8" or is_m3u:
-                text = convert_m3u_to_txt(text)
-
-            lines = text.split('\n')
-            print(f"行数: {len(lines)}")
-            for line in lines:
-                if "#genre#" not in line and "," in line and "://" in line and "tvbus://" not in line and "/udp/" not in line:
-                    channel_name, channel_address = line.split(',', 1)
-                    if "#" not in channel_address:
-                        process_channel_line(line)
-                    else: 
-                        url_list = channel_address.split('#')
-                        for channel_url in url_list:
-                            newline = f'{channel_name},{channel_url}'
-                            process_channel_line(newline)
-
-            other_lines.append('\n')
+
+        # 通过共享下载引擎读取（keep-alive连接池、压缩传输、超时）
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+        response = fetch_url(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.body
+        text = data.decode('utf-8').strip()
+
+        is_m3u = text.startswith("#EXTM3U") or text.startswith("#EXTINF")
+        if get_url_file_extension(url) == ".m3u" or get_url_file_extension(url) == ".m3u8" or is_m3u:
+            text = convert_m3u_to_txt(text)
+
+        lines = text.split('\n')
+        print(f"行数: {len(lines)}")
+        for line in lines:
+            if "#genre#" not in line and "," in line and "://" in line and "tvbus://" not in line and "/udp/" not in line:
+                channel_name, channel_address = line.split(',', 1)
+                if "#" not in channel_address:
+                    process_channel_line(line)
+                else: 
+                    url_list = channel_address.split('#')
+                    for channel_url in url_list:
+                        newline = f'{channel_name},{channel_url}'
+                        process_channel_line(newline)
+
+        other_lines.append('\n')
 
     except Exception as e:
         print(f"处理URL时发生错误：{e}")
@@ -574,17 +573,15 @@ def get_http_response(url, timeout=8, retries=2, backoff_factor=1.0):
     }
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                data = response.read()
-                return data.decode('utf-8')
-        except urllib.error.HTTPError as e:
-            print(f"[HTTPError] Code: {e.code}, URL: {url}")
-            break
-        except urllib.error.URLError as e:
-            print(f"[URLError] Reason: {e.reason}, Attempt: {attempt + 1}")
-        except socket.timeout:
+            response = fetch_url(url, headers=headers, timeout=timeout)
+            if not 200 <= response.status < 300:
+                print(f"[HTTPError] Code: {response.status}, URL: {url}")
+                break
+            return response.body.decode('utf-8')
+        except (asyncio.TimeoutError, socket.timeout):
             print(f"[Timeout] URL: {url}, Attempt: {attempt + 1}")
+        except OSError as e:
+            print(f"[URLError] Reason: {e}, Attempt: {attempt + 1}")
         except Exception as e:
             print(f"[Exception] {type(e).__name__}: {e}, Attempt: {attempt + 1}")
         